@@ -6,6 +6,7 @@ import discore
 from src.utils import *
 from src.settings import SettingsView
 from database.models.Event import Event
+from database.health import DBHealth
 
 __all__ = ('Commands',)
 
@@ -32,6 +33,9 @@ class Commands(discore.Cog,
     async def settings(self, i: discore.Interaction):
         entrypoint_context.set(f"command settings {{interaction={i!r}}}")
         await Event.buff_cr({'name': 'command_settings'})
+        if DBHealth.degraded():
+            await i.response.send_message(t('settings.degraded'), ephemeral=True)
+            return
         await SettingsView(i).send(i)
 
     @discore.app_commands.command(
@@ -10,6 +10,9 @@ from textwrap import shorten
 import discore
 
 from src import utils
+from src.send_queue import SendQueue
+from src.scheduler import FixScheduler
+from database.models.Event import Event
 
 __all__ = ('Developer',)
 
@@ -191,6 +194,82 @@ class Developer(discore.Cog,
         await i.response.send_message(embed=e)
 
 
+    @discore.app_commands.command(
+        name="stats",
+        description="Get the link fix throughput and failure rates of the last 24 hours",
+        auto_locale_strings=False)
+    @discore.app_commands.guilds(*dev_guilds)
+    async def stats(self, i: discore.Interaction) -> None:
+        if not discore.config.analytic:
+            await i.response.send_message("Analytics disabled")
+            return
+        await i.response.defer(thinking=True)
+
+        ratios, hourly = await asyncio.gather(
+            asyncio.to_thread(Event.error_ratios, days=1),
+            asyncio.to_thread(Event.counts_by_bucket, 'fixed_link', bucket='hour', days=1))
+        attempts = sum(total for total, _, _ in ratios.values())
+        failures = sum(failed for _, failed, _ in ratios.values())
+
+        e = discore.Embed(
+            title="Link fixes (last 24 hours)",
+            color=discore.config.color or None)
+        e.add_field(
+            name="Fixed links",
+            value=str(attempts - failures))
+        e.add_field(
+            name="Failed fixes",
+            value=f"{failures} ({failures / attempts:.1%})" if attempts else "0")
+        e.add_field(
+            name="Peak hour",
+            value=f"{max(hourly.values())} fixed links" if hourly else "None")
+        if ratios:
+            lines = [f"{'website':<12} {'fixes':>7} {'failed':>7} {'rate':>6}"] + [
+                f"{link_id:<12} {total:>7} {failed:>7} {ratio:>6.1%}"
+                for link_id, (total, failed, ratio) in ratios.items()
+            ]
+            e.description = f"```\n{discore.sanitize(chr(10).join(lines), 4080, replace_newline=False)}\n```"
+        discore.set_embed_footer(self.bot, e)
+
+        await i.followup.send(embed=e)
+
+    @discore.app_commands.command(
+        name="queues",
+        description="Get the state of the fix scheduler and of the outbound message queues",
+        auto_locale_strings=False)
+    @discore.app_commands.guilds(*dev_guilds)
+    async def queues(self, i: discore.Interaction) -> None:
+        stats = SendQueue.stats()
+
+        e = discore.Embed(
+            title="Outbound queues",
+            color=discore.config.color or None)
+        e.add_field(
+            name="Active channels",
+            value=str(stats['channels']))
+        e.add_field(
+            name="Queued messages",
+            value=f"{stats['depth']} (longest queue: {stats['max_depth']})")
+        e.add_field(
+            name="Sent messages",
+            value=f"{stats['sent']} ({stats['merged']} merged fixes)")
+        e.add_field(
+            name="Wait time",
+            value=f"{stats['avg_wait_ms']:.0f} ms on average, {stats['max_wait_ms']:.0f} ms at most")
+        scheduler = FixScheduler.stats()
+        e.add_field(
+            name="Scheduled fixes",
+            value=f"{scheduler['running']} running, {scheduler['waiting']} waiting in {scheduler['guilds']} guilds")
+        e.add_field(
+            name="Overload level",
+            value=f"{scheduler['level']} ({scheduler['level'].name.lower()})")
+        e.add_field(
+            name="Shed links",
+            value=f"{scheduler['shed_rate']} over the guild rates, {scheduler['shed_overload']} under overload")
+        discore.set_embed_footer(self.bot, e)
+
+        await i.response.send_message(embed=e)
+
     @discore.app_commands.command(
         name="add_premium",
         description="Enable the premium features to test",
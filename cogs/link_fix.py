@@ -2,7 +2,7 @@
 Intercepts messages, detects links that can be fixed, and sends the fixed links accordingly.
 """
 
-import re
+import functools
 from typing import List
 import discord_markdown_ast_parser as dmap
 from discord_markdown_ast_parser.parser import NodeType
@@ -13,8 +13,13 @@ from database.models.Role import Role
 from database.models.TextChannel import *
 from database.models.Guild import *
 from database.models.Event import *
+from database.guild_settings import GuildSettings, SettingsCache
 from src.websites import *
 from src.utils import *
+from src.waiters import EmbedWaiters
+from src.webhooks import WebhookCache
+from src.send_queue import SendQueue
+from src.scheduler import FixScheduler, OverloadLevel
 
 import discore
 
@@ -23,11 +28,11 @@ __all__ = ('LinkFix',)
 _logger = logging.getLogger(__name__)
 
 
-def get_website(guild: Guild, url: str, spoiler: bool = False) -> WebsiteLink | None:
+def get_website(guild: GuildSettings, url: str, spoiler: bool = False) -> WebsiteLink | None:
     """
     Get the website of the URL.
 
-    :param guild: the guild associated with the context
+    :param guild: the settings of the guild associated with the context
     :param url: the URL to check
     :param spoiler: whether the link is in a spoiler
     :return: the website of the URL
@@ -39,15 +44,17 @@ def get_website(guild: Guild, url: str, spoiler: bool = False) -> WebsiteLink |
     return None
 
 
-def filter_fixable_links(links: List[tuple[str, bool]], guild: Guild) -> List[WebsiteLink]:
+def filter_fixable_links(links: List[tuple[str, bool]], guild: GuildSettings) -> List[WebsiteLink]:
     """
     Get only the fixable links from the list of links.
 
     :param links: the links to filter (url, spoiler)
-    :param guild: the guild associated with the context
+    :param guild: the settings of the guild associated with the context
     :return: the fixable links as WebsiteLink
     """
 
+    if not guild.any_website_enabled and not guild.custom_websites:
+        return []
     return [link for url, spoiler in links if (link := get_website(guild, url, spoiler)) is not None]
 
 
@@ -105,13 +112,13 @@ async def _format_link_data(link: WebsiteLink, original_message: discore.Message
 
 async def fix_embeds(
         original_message: discore.Message,
-        guild: Guild,
+        guild: GuildSettings,
         links: List[WebsiteLink]) -> None:
     """
     Edit the message if necessary, and send the fixed links.
 
     :param original_message: the message to fix
-    :param guild: the guild associated with the context
+    :param guild: the settings of the guild associated with the context
     :param links: the WebsiteLink objects to fix
 
     Remark:
@@ -142,15 +149,20 @@ async def fix_embeds(
             return [], {}
         return await send_fixed_links(rendered_links, guild, original_message)
 
-    if guild.reply_as_original_author_replica:
-        not_sent, messages = await render_and_send()
-    else:
-        async with Typing(channel):
+    # the slot is only held while the links are rendered and sent, the verifications afterward mostly waiting
+    async with FixScheduler.slot(original_message.guild.id, len(links)):
+        if guild.reply_as_original_author_replica or FixScheduler.level() >= OverloadLevel.NO_TYPING:
             not_sent, messages = await render_and_send()
+        else:
+            async with DelayedTyping(channel):
+                not_sent, messages = await render_and_send()
 
     to_delete = []
     if messages:
-        results = await asyncio.gather(*(wait_for_embed(msg) for msg in messages))
+        if FixScheduler.level() >= OverloadLevel.NO_EMBED_CHECK:
+            results = [True] * len(messages)
+        else:
+            results = await asyncio.gather(*(wait_for_embed(msg) for msg in messages))
         to_delete = [msg for msg, has_embed in zip(messages, results) if not has_embed]
 
         if to_delete:
@@ -159,7 +171,10 @@ async def fix_embeds(
                 for msg in to_delete for link in messages.get(msg, [])]
             _logger.warning("Message(s) has no embed after waiting: %s", repr(err_data))
             await Event.buff_cr(*err_data)
-            await asyncio.gather(*(safe_send_coro(m.delete(), not_found=True, forbidden=True) for m in to_delete))
+            if len(to_delete) > 1 and permissions.manage_messages:
+                await safe_send_coro(channel.delete_messages(to_delete), not_found=True, forbidden=True)
+            else:
+                await asyncio.gather(*(safe_send_coro(m.delete(), not_found=True, forbidden=True) for m in to_delete))
         for msg, msg_links in messages.items():
             if msg not in to_delete:
                 await Event.buff_cr(*[
@@ -178,7 +193,7 @@ async def fix_embeds(
 
 async def send_fixed_links(
         rendered_links: list[WebsiteLink],
-        guild: Guild,
+        guild: GuildSettings,
         original_message: discore.Message
 ) -> tuple[list[tuple[str, list[WebsiteLink]]], dict[discore.Message, list[WebsiteLink]]]:
     """
@@ -197,7 +212,7 @@ async def send_fixed_links(
       return that not everything was sent.
 
     :param rendered_links: the rendered WebsiteLink objects to send
-    :param guild: the guild associated with the context
+    :param guild: the settings of the guild associated with the context
     :param original_message: the original message associated with the context to reply to
     :return: a tuple containing the list of links that failed to be sent, and a dict of the messages sent with their corresponding links
     """
@@ -205,17 +220,20 @@ async def send_fixed_links(
     messages_sent: dict[discore.Message, list[WebsiteLink]] = {}
     links_failed: list[tuple[str, list[WebsiteLink]]] = []
 
-    grouped = group_items(rendered_links, 2000)
+    # packing the links tighter may save messages, at the cost of their order across messages
+    grouped = group_items(rendered_links, 2000, packing='first_fit_decreasing')
     use_original_author_replica = guild.reply_as_original_author_replica
-    webhook = await get_or_create_webhook(original_message.channel) if use_original_author_replica else None
 
     for i, (message_content, links_in_group) in enumerate(grouped):
+        webhook = await WebhookCache.get(original_message.channel) if use_original_author_replica else None
         if webhook is not None:
             coro = webhook_send(webhook, original_message, message_content, guild.reply_silently)
         elif i == 0 and guild.reply_to_message:
-            coro = discore.fallback_reply(original_message, message_content, silent=guild.reply_silently)
+            coro = SendQueue.send(
+                original_message.channel, message_content, guild.reply_silently,
+                functools.partial(discore.fallback_reply, original_message, message_content, silent=guild.reply_silently))
         else:
-            coro = original_message.channel.send(message_content, silent=guild.reply_silently)
+            coro = SendQueue.send(original_message.channel, message_content, guild.reply_silently)
 
         sent, msg = await safe_send_coro(coro, invalid_form_body='Embed size exceeds maximum size', forbidden=True)
         if sent and msg:
@@ -226,38 +244,6 @@ async def send_fixed_links(
     return links_failed, messages_sent
 
 
-async def get_or_create_webhook(channel: GuildMessageableChannel) -> discore.Webhook | None:
-    """
-    Get or create the webhook used to send messages as the original author.
-
-    :param channel: the channel to send the fixed links to
-    :return: the webhook to use, if available
-    """
-
-    webhook_channel = channel.parent if isinstance(channel, discore.Thread) else channel
-    if webhook_channel is None:
-        return None
-
-    if not hasattr(webhook_channel, 'webhooks') or not hasattr(webhook_channel, 'create_webhook'):
-        return None
-
-    if not webhook_channel.permissions_for(channel.guild.me).manage_webhooks:
-        return None
-
-    success, webhooks = await safe_send_coro(webhook_channel.webhooks(), forbidden=True)
-    if not success:
-        return None
-    bot = discore.Bot.get()
-    webhook = next((
-        w for w in webhooks
-        if getattr(w.user, 'id', None) == bot.user.id
-    ), None)
-    if webhook is not None:
-        return webhook
-    success, webhook = await safe_send_coro(webhook_channel.create_webhook(name=bot.user.display_name), forbidden=True)
-    return webhook if success else None
-
-
 async def webhook_send(
         webhook: discore.Webhook,
         original_message: discore.Message,
@@ -266,6 +252,7 @@ async def webhook_send(
 ) -> discore.Message:
     """
     Send a fixed link using the original author's display name and avatar.
+    If the webhook was deleted, it is forgotten, and the message is sent again with a new one.
 
     :param webhook: the webhook to use
     :param original_message: the message associated with the context to reply to
@@ -283,7 +270,14 @@ async def webhook_send(
     }
     if isinstance(original_message.channel, discore.Thread):
         kwargs['thread'] = original_message.channel
-    return await webhook.send(**kwargs)
+    try:
+        return await webhook.send(**kwargs)
+    except discore.NotFound:
+        WebhookCache.invalidate(webhook.channel_id, webhook)
+        webhook = await WebhookCache.get(original_message.channel)
+        if webhook is None:
+            raise
+        return await webhook.send(**kwargs)
 
 
 async def wait_for_embed(message: discore.Message) -> bool:
@@ -295,20 +289,16 @@ async def wait_for_embed(message: discore.Message) -> bool:
 
     if message.embeds:
         return True
-    def check(before: discore.Message, after: discore.Message) -> bool:
-        return after.id == message.id and len(after.embeds) > len(before.embeds)
-    try:
-        await discore.Bot.get().wait_for('message_edit', check=check, timeout=6)
-    except asyncio.TimeoutError:
-        return True if message.embeds else False
-    return True
+    if await EmbedWaiters.wait(message.id, 6):
+        return True
+    return True if message.embeds else False
 
 
-async def edit_original_message(guild: Guild, message: discore.Message, permissions: discore.Permissions) -> None:
+async def edit_original_message(guild: GuildSettings, message: discore.Message, permissions: discore.Permissions) -> None:
     """
     Edit the original message according to the guild settings and permissions.
 
-    :param guild: the guild associated with the context
+    :param guild: the settings of the guild associated with the context
     :param message: the message to edit
     :param permissions: the permissions of the bot in the channel the message was sent in
     """
@@ -318,11 +308,12 @@ async def edit_original_message(guild: Guild, message: discore.Message, permissi
     if guild.original_message == OriginalMessage.DELETE:
         await safe_send_coro(message.delete(), not_found=True, forbidden=True)
     else:
-        await wait_for_embed(message)
+        if FixScheduler.level() < OverloadLevel.NO_EMBED_CHECK:
+            await wait_for_embed(message)
         await safe_send_coro(message.edit(suppress=True), not_found=True, forbidden=True)
-        await asyncio.sleep(1)
-        if message.embeds:
-            await safe_send_coro(message.edit(suppress=True), not_found=True, forbidden=True)
+        # Discord may still attach an embed after the suppression, which then has to be suppressed again
+        EmbedWaiters.watch(message.id, 6, lambda: safe_send_coro(
+            message.edit(suppress=True), not_found=True, forbidden=True))
 
 
 class LinkFix(discore.Cog,
@@ -353,23 +344,52 @@ class LinkFix(discore.Cog,
         if not urls:
             return
 
-        guild = Guild.find_or_create(message.guild)
+        guild = await SettingsCache.get(message.guild)
         links = filter_fixable_links(urls, guild)
 
         if not links:
             return
-        if any(
-                re.search(rf"\b{re.escape(k)}\b", message.content) for k in guild.keywords
-        ) != guild.keywords_use_allow_list:
+        if guild.matches_keywords(message.content) != guild.keywords_use_allow_list:
             return
-        if not TextChannel.find_get_enabled(message.channel, guild):
+        if not await TextChannel.load_get_enabled(message.channel, guild):
             return
-        if isinstance(message.author, discore.Member) and (
-            not Member.find_get_enabled(message.author, guild)
-            or not (any if (guild and guild.roles_use_any_rule) else all)(Role.finds_get_enabled(message.author.roles, guild))
-        ):
-            return
-        if message.webhook_id is not None and not bool(guild.webhooks):
+        if isinstance(message.author, discore.Member):
+            member_enabled, roles_enabled = await asyncio.gather(
+                Member.load_get_enabled(message.author, guild),
+                Role.loads_get_enabled(message.author.roles, guild))
+            if not member_enabled or not (any if guild.roles_use_any_rule else all)(roles_enabled):
+                return
+        if message.webhook_id is not None and not guild.webhooks:
             return
 
+        admitted = 0 if FixScheduler.overloaded(message.guild.id, len(links)) else FixScheduler.admit(
+            message.guild.id, len(links))
+        if admitted < len(links):
+            await Event.buff_cr(*[
+                {'name': 'fixed_link_shed', 'data': await _format_link_data(link, message)}
+                for link in links[admitted:]])
+            links = links[:admitted]
+            if not links:
+                return
+
         await fix_embeds(message, guild, links)
+
+    @discore.Cog.listener()
+    async def on_raw_message_edit(self, payload: discore.RawMessageUpdateEvent) -> None:
+        """
+        React to message edition events, even for the messages that aren't cached
+
+        :param payload: The raw event payload
+        """
+
+        EmbedWaiters.feed(payload.message_id, payload.data)
+
+    @discore.Cog.listener()
+    async def on_webhooks_update(self, channel: discore.abc.GuildChannel) -> None:
+        """
+        React to the creation, edition or deletion of a webhook in a channel
+
+        :param channel: The channel whose webhooks were updated
+        """
+
+        WebhookCache.updated(channel.id)
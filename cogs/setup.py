@@ -1,8 +1,12 @@
 import logging
+import time
 import aiohttp
 
 from src import utils
 from database.models.Event import *
+from database.guild_settings import SettingsCache
+from database.cache_sync import CacheSync
+from src.scheduler import FixScheduler
 
 import discore
 
@@ -28,13 +32,45 @@ class Setup(discore.Cog,
         else:
             _logger.warning("[TOP.GG] `config.topgg_token` not set, autopost disabled")
 
+        if snapshot_file := self.snapshot_file():
+            count = SettingsCache.load_snapshot(snapshot_file)
+            _logger.info("[CACHE] Loaded a settings snapshot of %d guilds", count)
+            self.save_settings_snapshot.change_interval(
+                minutes=discore.config.settings_cache.snapshot_interval_minutes or 10)
+            self.save_settings_snapshot.start()
+
+        if CacheSync.enabled():
+            _logger.info("[CACHE] Starting cross-process cache invalidation")
+            self.sync_cache.change_interval(seconds=discore.config.cache_sync.poll_seconds or 2)
+            self.sync_cache.start()
+
     async def cog_unload(self):
+        if self.warm_up_task is not None and not self.warm_up_task.done():
+            self.warm_up_task.cancel()
+
         if self.update_activity.is_running():
             self.update_activity.cancel()
 
         if self.topgg_autopost.is_running():
             self.topgg_autopost.cancel()
 
+        if self.sync_cache.is_running():
+            self.sync_cache.cancel()
+
+        if self.save_settings_snapshot.is_running():
+            self.save_settings_snapshot.cancel()
+            count = await SettingsCache.save_snapshot(self.snapshot_file(), self.current_guild_ids())
+            _logger.info("[CACHE] Saved a settings snapshot of %d guilds", count)
+
+    @staticmethod
+    def snapshot_file() -> str | None:
+        """The path of the settings snapshot file, None if snapshots are disabled"""
+        return discore.config.settings_cache and discore.config.settings_cache.snapshot_file
+
+    def current_guild_ids(self) -> set[int] | None:
+        """The ids of the guilds of the bot, None if they aren't known yet, e.g. before the bot is ready"""
+        return {guild.id for guild in self.bot.guilds} if self.bot.is_ready() else None
+
     @discore.Cog.listener()
     async def on_login(self):
         utils.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
@@ -47,6 +83,46 @@ class Setup(discore.Cog,
         if not utils.is_sku():
             _logger.warning("`config.sku` not set, premium features unavailable")
 
+    warm_up_task: asyncio.Task | None = None
+    premium_loaded: bool = False
+
+    @discore.Cog.listener()
+    async def on_ready(self):
+        if not self.premium_loaded:
+            self.premium_loaded = True
+            try:
+                await FixScheduler.load_premium(self.bot)
+            except Exception as e:
+                # retried on the next ready event, the guilds keeping their configured weight meanwhile
+                self.premium_loaded = False
+                _logger.warning("[SCHEDULER] Failed to load the premium guilds: %r", e)
+
+        config = discore.config.settings_cache
+        if not (config and config.warm_up) or self.warm_up_task is not None:
+            return
+        self.warm_up_task = asyncio.create_task(self.warm_up_settings(
+            config.warm_up_chunk_size or 500, config.warm_up_concurrency or 2))
+
+    @discore.Cog.listener()
+    async def on_entitlement_create(self, entitlement: discore.Entitlement):
+        FixScheduler.on_entitlement(entitlement)
+
+    @discore.Cog.listener()
+    async def on_entitlement_update(self, entitlement: discore.Entitlement):
+        FixScheduler.on_entitlement(entitlement)
+
+    @discore.Cog.listener()
+    async def on_entitlement_delete(self, entitlement: discore.Entitlement):
+        FixScheduler.on_entitlement(entitlement, deleted=True)
+
+    async def warm_up_settings(self, chunk_size: int, concurrency: int) -> None:
+        """Load the settings of the bot guilds into the cache, so that their first messages don't wait on the DB."""
+
+        start = time.perf_counter()
+        _logger.info("[CACHE] Warming up the settings of %d guilds", len(self.bot.guilds))
+        cached = await SettingsCache.warm_up(self.bot.guilds, chunk_size, concurrency)
+        _logger.info("[CACHE] Cached the settings of %d guilds in %.1fs", cached, time.perf_counter() - start)
+
     @discore.loop(hours=1)
     async def update_activity(self) -> None:
         """Update the bot activity every hour."""
@@ -58,7 +134,7 @@ class Setup(discore.Cog,
                 return f"{n / 1_000:.1f}".rstrip('0').rstrip('.') + 'k'
             return str(n)
 
-        fixed_links_nb = len(Event.since('fixed_link', days=1))
+        fixed_links_nb = Event.count_since('fixed_link', days=1)
         if fixed_links_nb == 0:
             return
 
@@ -70,6 +146,34 @@ class Setup(discore.Cog,
     async def before_update_activity(self) -> None:
         await self.bot.wait_until_ready()
 
+    @discore.loop(minutes=10)
+    async def save_settings_snapshot(self) -> None:
+        """Save the settings cache to disk periodically, so that a restart after a crash still starts warm."""
+
+        try:
+            count = await SettingsCache.save_snapshot(self.snapshot_file(), self.current_guild_ids())
+        except OSError as e:
+            _logger.error("[CACHE] Failed to save the settings snapshot: %r", e)
+            return
+        _logger.info("[CACHE] Saved a settings snapshot of %d guilds", count)
+
+    @save_settings_snapshot.before_loop
+    async def before_save_settings_snapshot(self) -> None:
+        await self.bot.wait_until_ready()
+        await asyncio.sleep(self.save_settings_snapshot.minutes * 60)
+
+    @discore.loop(seconds=2)
+    async def sync_cache(self) -> None:
+        """Apply the cache invalidations of the other processes, and prune the old ones from time to time."""
+
+        try:
+            if applied := await CacheSync.poll():
+                _logger.debug("[CACHE] Applied %d invalidations from other processes", applied)
+            if self.sync_cache.current_loop % 1000 == 0:
+                await asyncio.to_thread(CacheSync.prune)
+        except Exception as e:
+            _logger.warning("[CACHE] Failed to poll the cache invalidations: %r", e)
+
     @discore.loop(hours=1)
     async def topgg_autopost(self) -> None:
         """Update the guild count on top.gg every hour."""
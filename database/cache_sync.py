@@ -0,0 +1,198 @@
+"""
+Cache coherence between several bot processes sharing a database (e.g. one process per shard range).
+
+Each write to cached data is recorded in the `cache_invalidations` table, as a (table, guild id) change. Every process
+polls the rows it hasn't applied yet and drops the matching cache entries. A process ignores its own changes, as it
+already invalidated its cache when writing. Stale reads are therefore bounded by the poll interval.
+
+The ids can't be used as a high-water mark: they are given at insert time, so a row committing after a row inserted
+later has a lower id than a row already seen. Each poll therefore reads again the rows created in the last
+`late_commit_seconds` before the newest row seen (by the database clock, which sets `created_at`), and skips the ids it
+already applied. A row committing later than that is missed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import time
+import uuid
+from typing import Callable
+
+import discore
+from masoniteorm.query import QueryBuilder
+
+__all__ = ('CacheSync',)
+
+_logger = logging.getLogger(__name__)
+
+
+class CacheSync:
+    """DB-backed invalidation channel between processes."""
+
+    __table__ = 'cache_invalidations'
+
+    origin: str = uuid.uuid4().hex
+    # invalidation handlers by table, called with a guild id, or None to drop every entry
+    _handlers: dict[str, list[Callable[[int | None], None]]] = {}
+    # start of the window of changes read again, None before the first poll or while no change has been seen
+    _since: dt.datetime | None = None
+    # ids of the changes of the window already applied, with their creation date
+    _applied: dict[int, dt.datetime] = {}
+    _started: bool = False
+    _last_poll: float = 0.0
+
+    @classmethod
+    def enabled(cls) -> bool:
+        """Whether invalidations are shared with other processes"""
+        return bool(discore.config.cache_sync and discore.config.cache_sync.enabled)
+
+    @classmethod
+    def retention(cls) -> dt.timedelta:
+        """How long the changes are kept in the database"""
+        return dt.timedelta(minutes=(discore.config.cache_sync and discore.config.cache_sync.retention_minutes) or 60)
+
+    @classmethod
+    def late_commit_margin(cls) -> dt.timedelta:
+        """How long after its creation a change may commit and still be applied"""
+        return dt.timedelta(
+            seconds=(discore.config.cache_sync and discore.config.cache_sync.late_commit_seconds) or 10)
+
+    @classmethod
+    def subscribe(cls, table: str, handler: Callable[[int | None], None]) -> None:
+        """
+        Register a cache invalidation handler for the changes of a table made by other processes.
+
+        :param table: the table whose changes to listen to
+        :param handler: the handler, called with the id of the changed guild, or None if any guild may have changed
+        """
+        cls._handlers.setdefault(table, []).append(handler)
+
+    @classmethod
+    def publish(cls, table: str, guild_id: int) -> None:
+        """
+        Record a change, for the other processes to invalidate their cache. Does nothing if the sync is disabled.
+
+        :param table: the changed table
+        :param guild_id: the guild whose data changed
+        """
+
+        if not cls.enabled():
+            return
+        try:
+            QueryBuilder().table(cls.__table__).create({
+                'origin': cls.origin,
+                'table_name': table,
+                'guild_id': guild_id,
+            })
+        except Exception as e:
+            _logger.warning("[CACHE] Failed to publish the invalidation of %s for guild %d: %r", table, guild_id, e)
+
+    @classmethod
+    def _flush(cls) -> None:
+        """Call every handler for every guild."""
+        for handlers in cls._handlers.values():
+            for handler in handlers:
+                handler(None)
+
+    @staticmethod
+    def _datetime(value: dt.datetime | str) -> dt.datetime:
+        """
+        Get a date read from the database as a datetime, as SQLite gives them as strings.
+
+        :param value: the date
+        :return: the datetime
+        """
+        return value if isinstance(value, dt.datetime) else dt.datetime.fromisoformat(value)
+
+    @classmethod
+    def _last_created_at(cls) -> dt.datetime | None:
+        """
+        Get the creation date of the newest change, by the database clock. Blocking.
+
+        :return: the date, None if there is no change
+        """
+        row = QueryBuilder().table(cls.__table__).select_raw('MAX(created_at) AS last_created_at').first()
+        last_created_at = (row or {}).get('last_created_at')
+        return cls._datetime(last_created_at) if last_created_at else None
+
+    @classmethod
+    def _fetch_changes(cls, since: dt.datetime | None, after_id: int, batch_size: int) -> list[dict]:
+        """
+        Fetch the changes created since a date, following an id. Blocking.
+
+        :param since: the date from which to fetch the changes, None to fetch them all
+        :param after_id: the id after which to fetch the changes
+        :param batch_size: the maximum number of changes to fetch
+        :return: the changes, in id order
+        """
+        query = QueryBuilder().table(cls.__table__).select('id', 'origin', 'table_name', 'guild_id', 'created_at')
+        if since is not None:
+            query = query.where('created_at', '>=', since)
+        return query.where('id', '>', after_id).order_by('id').limit(batch_size).get().all()
+
+    @classmethod
+    async def poll(cls, batch_size: int = 1000) -> int:
+        """
+        Apply the changes made by the other processes since the last poll.
+        The queries run in a worker thread, the handlers in the event loop.
+        On the first poll, the changes already recorded are only marked as applied.
+        If the previous successful poll is older than the retention, changes may have been pruned unseen,
+        so every cache entry is dropped.
+
+        :param batch_size: the maximum number of changes read per query
+        :return: the number of changes applied
+        """
+
+        now = time.monotonic()
+        margin = cls.late_commit_margin()
+        if not cls._started:
+            last_created_at = await asyncio.to_thread(cls._last_created_at)
+            cls._since = last_created_at - margin if last_created_at else None
+
+        applied = 0
+        gap = cls._started and now - cls._last_poll > cls.retention().total_seconds()
+        after_id = 0
+        newest: dt.datetime | None = None
+        while True:
+            rows = await asyncio.to_thread(cls._fetch_changes, cls._since, after_id, batch_size)
+            if gap:
+                _logger.warning("[CACHE] Invalidation poll gap longer than the retention, dropping every cache entry")
+                cls._flush()
+                gap = False
+            for row in rows:
+                after_id = row['id']
+                created_at = cls._datetime(row['created_at'])
+                if newest is None or created_at > newest:
+                    newest = created_at
+                if after_id in cls._applied:
+                    continue
+                cls._applied[after_id] = created_at
+                if cls._started and row['origin'] != cls.origin:
+                    for handler in cls._handlers.get(row['table_name'], []):
+                        handler(row['guild_id'])
+                    applied += 1
+            if len(rows) < batch_size:
+                break
+
+        if newest is not None and (cls._since is None or newest - margin > cls._since):
+            cls._since = newest - margin
+        if cls._since is not None:
+            cls._applied = {
+                change_id: created_at for change_id, created_at in cls._applied.items() if created_at >= cls._since}
+        cls._started = True
+        cls._last_poll = now
+        return applied
+
+    @classmethod
+    def prune(cls) -> None:
+        """
+        Delete the changes older than the retention, before the newest change. Blocking.
+        The dates are set by the database clock, whose timezone may not be the one of the bot, so the local time
+        isn't used.
+        """
+
+        last_created_at = cls._last_created_at()
+        if last_created_at is not None:
+            QueryBuilder().table(cls.__table__).where('created_at', '<', last_created_at - cls.retention()).delete()
@@ -1,12 +1,26 @@
 import discore
 
-from masoniteorm.connections import ConnectionResolver
+from masoniteorm.connections import ConnectionResolver, ConnectionFactory
+
+from database.connections import ReplicaMySQLConnection, WALSQLiteConnection
 
 if not discore.config.loaded:
     discore.config_init()
 discore.logging_init()
 
-DB = ConnectionResolver().set_connection_details({
+# driver of the read replica connection, for the drivers whose connections can't be shared with the main database
+REPLICA_DRIVERS = {'mysql': 'mysql_replica'}
+ConnectionFactory.register('mysql_replica', ReplicaMySQLConnection)
+ConnectionFactory.register('sqlite_wal', WALSQLiteConnection)
+
+connections = {
     "default": "main",
-    "main": discore.config.database
-})
+    "main": discore.config.database,
+}
+if discore.config.database_replica:
+    # the replica settings override the main ones, e.g. only `host` (or `database`, for SQLite) needs to be set
+    replica = {**discore.config.database, **discore.config.database_replica}
+    replica['driver'] = REPLICA_DRIVERS.get(replica.get('driver'), replica.get('driver'))
+    connections["replica"] = replica
+
+DB = ConnectionResolver().set_connection_details(connections)
@@ -0,0 +1,353 @@
+"""
+Custom masonite connection classes, registered under their own driver names by `database/config.py`.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+from masoniteorm.connections import MySQLConnection, SQLiteConnection
+from masoniteorm.connections.SQLiteConnection import regexp
+from masoniteorm.exceptions import QueryException
+from masoniteorm.schema.platforms import SQLitePlatform
+
+__all__ = ('ReplicaMySQLConnection', 'WALSQLiteConnection', 'WALSQLitePlatform')
+
+
+class ReplicaMySQLConnection(MySQLConnection):
+    """
+    MySQL connection to a read replica (driver `mysql_replica`).
+    Masonite pools the connections of every MySQL database in a single module-level list: this class keeps its own
+    pool, so that a pooled replica connection is never handed to a query meant for the main database.
+    """
+
+    _pool: list = []
+
+    def create_connection(self, autocommit=True):
+        import pymysql
+
+        if self.full_details.get("connection_pooling_enabled") and self._pool:
+            connection = self._pool.pop()
+        else:
+            connection = pymysql.connect(
+                cursorclass=pymysql.cursors.DictCursor,
+                autocommit=autocommit,
+                host=self.host,
+                user=self.user,
+                password=self.password,
+                port=self.port,
+                database=self.database,
+                **self.options,
+            )
+        connection.close = self.close_connection
+        self.open = 1
+        return connection
+
+    def close_connection(self):
+        if self.full_details.get("connection_pooling_enabled") and len(self._pool) < self.connection_pool_size:
+            self._pool.append(self._connection)
+        self.open = 0
+        self._connection = None
+
+
+class WALSQLitePlatform(SQLitePlatform):
+    """
+    Schema platform of the `sqlite_wal` driver.
+
+    Masonite alters SQLite tables by copying them into a new table, which loses their indexes, foreign keys and the
+    data of renamed columns. This platform uses the native `ALTER TABLE` statements where SQLite has them (add, rename
+    and drop a column), and otherwise rebuilds the table the way SQLite documents it, indexes and foreign keys included.
+    Unique constraints are created as named unique indexes, so that they can be dropped by name, and auto-incremented
+    ids are rowid aliases.
+    """
+
+    type_map = {**SQLitePlatform.type_map, 'big_increments': 'INTEGER'}
+
+    def get_current_schema(self, connection, table_name, schema=None):
+        table = super().get_current_schema(connection, table_name, schema)
+        table.sqlite_columns = connection.query(f'PRAGMA table_info("{table_name}")', ())
+        table.sqlite_foreign_keys = connection.query(f'PRAGMA foreign_key_list("{table_name}")', ())
+        table.sqlite_indexes = {}
+        for index in connection.query(f'PRAGMA index_list("{table_name}")', ()):
+            if index['origin'] == 'pk':
+                continue
+            columns = [row['name'] for row in connection.query(f'PRAGMA index_info("{index["name"]}")', ())]
+            table.sqlite_indexes[index['name']] = (columns, bool(index['unique']))
+        create_sql = connection.query(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,), results=1)
+        table.sqlite_autoincrement = 'AUTOINCREMENT' in (create_sql or {}).get('sql', '').upper()
+        return table
+
+    def index_sql(self, table: str, name: str, columns: list[str], unique: bool = False) -> str:
+        """
+        Build the statement creating an index.
+
+        :param table: the name of the table
+        :param name: the name of the index
+        :param columns: the indexed columns
+        :param unique: whether the index is unique
+        :return: the statement
+        """
+        return (f"CREATE {'UNIQUE ' if unique else ''}INDEX {self.wrap_column(name)} ON {self.wrap_table(table)}"
+                f"({', '.join(self.wrap_column(column) for column in columns)})")
+
+    def compile_create_sql(self, table, if_not_exists=False):
+        unique = {
+            name: constraint for name, constraint in table.added_constraints.items()
+            if constraint.constraint_type == 'unique'}
+        for name in unique:
+            table.added_constraints.pop(name)
+        sql = super().compile_create_sql(table, if_not_exists)
+        sql.extend(self.index_sql(table.name, name, list(constraint.columns), unique=True)
+                   for name, constraint in unique.items())
+        return sql
+
+    def compile_alter_sql(self, diff):
+        from_table = diff.from_table
+        removed_indexes = set(diff.removed_indexes) | set(diff.removed_unique_indexes)
+        dropped_columns = set(diff.dropped_columns)
+        kept_indexes = {
+            name: (columns, unique) for name, (columns, unique) in from_table.sqlite_indexes.items()
+            if name not in removed_indexes and not dropped_columns & set(columns)}
+        # columns SQLite can't drop natively
+        keys = ({row['name'] for row in from_table.sqlite_columns if row['pk']}
+                | {row['from'] for row in from_table.sqlite_foreign_keys})
+        rebuild = bool(
+            diff.changed_columns or diff.added_foreign_keys or diff.dropped_foreign_keys or dropped_columns & keys
+            or any(column.primary or column.column_type in ('increments', 'big_increments')
+                   for column in diff.added_columns.values()))
+
+        sql = [f"DROP INDEX {self.wrap_column(name)}"
+               for name in from_table.sqlite_indexes if name not in kept_indexes]
+        if rebuild:
+            sql.extend(self._rebuild_sql(diff, kept_indexes))
+        else:
+            for old_name, column in diff.renamed_columns.items():
+                sql.append(f"ALTER TABLE {self.wrap_table(diff.name)} RENAME COLUMN "
+                           f"{self.wrap_column(old_name)} TO {self.wrap_column(column.name)}")
+            for name in diff.dropped_columns:
+                sql.append(f"ALTER TABLE {self.wrap_table(diff.name)} DROP COLUMN {self.wrap_column(name)}")
+            for name, column in diff.added_columns.items():
+                if column.default is None:
+                    # SQLite can't add a NOT NULL column without a default, unlike MySQL which uses an implicit one
+                    column.is_null = True
+                sql.append(f"ALTER TABLE {self.wrap_table(diff.name)} ADD COLUMN {self.columnize({name: column})[0]}")
+
+        for name, index in diff.added_indexes.items():
+            sql.append(self.index_sql(diff.name, index.name, list(index.column)))
+        for name, constraint in diff.added_constraints.items():
+            if constraint.constraint_type == 'unique':
+                sql.append(self.index_sql(diff.name, constraint.name, list(constraint.columns), unique=True))
+        if diff.new_name:
+            sql.append(f"ALTER TABLE {self.wrap_table(diff.name)} RENAME TO {self.wrap_table(diff.new_name)}")
+        return sql
+
+    def _rebuild_sql(self, diff, kept_indexes: dict[str, tuple[list[str], bool]]) -> list[str]:
+        """
+        Build the statements altering a table by rebuilding it: create the new table, copy the rows, drop the old
+        table, rename the new one, and recreate the indexes, in a transaction with the foreign keys checks disabled.
+
+        :param diff: the changes to the table
+        :param kept_indexes: the indexes of the table to recreate, as (columns, unique) by name
+        :return: the statements
+        """
+
+        from_table = diff.from_table
+        renames = {old_name: column.name for old_name, column in diff.renamed_columns.items()}
+        new_table = f"__new__{diff.name}"
+
+        columns: dict[str, str] = {}
+        copied: dict[str, str] = {}
+        primary_keys = [row['name'] for row in sorted(from_table.sqlite_columns, key=lambda row: row['pk']) if row['pk']]
+        for row in from_table.sqlite_columns:
+            if row['name'] in diff.dropped_columns:
+                continue
+            name = renames.get(row['name'], row['name'])
+            definition = f"{self.wrap_column(name)} {row['type']}"
+            if primary_keys == [row['name']]:
+                definition += " PRIMARY KEY AUTOINCREMENT" if from_table.sqlite_autoincrement else " PRIMARY KEY"
+            if row['notnull']:
+                definition += " NOT NULL"
+            if row['dflt_value'] is not None:
+                definition += f" DEFAULT {row['dflt_value']}"
+            columns[name] = definition
+            copied[name] = row['name']
+        for name, column in diff.changed_columns.items():
+            columns[name] = self.columnize({name: column})[0]
+        for name, column in diff.added_columns.items():
+            if column.primary or column.column_type in ('increments', 'big_increments'):
+                columns = {name: f"{self.wrap_column(name)} INTEGER PRIMARY KEY AUTOINCREMENT", **columns}
+            else:
+                if column.default is None:
+                    column.is_null = True
+                columns[name] = self.columnize({name: column})[0]
+
+        constraints = []
+        if len(primary_keys) > 1:
+            constraints.append(
+                f"PRIMARY KEY ({', '.join(self.wrap_column(renames.get(key, key)) for key in primary_keys)})")
+        dropped_foreign_keys = set(diff.dropped_foreign_keys)
+        for row in from_table.sqlite_foreign_keys:
+            if f"{diff.name}_{row['from']}_foreign" in dropped_foreign_keys or row['from'] in diff.dropped_columns:
+                continue
+            constraints.append(
+                f"FOREIGN KEY ({self.wrap_column(renames.get(row['from'], row['from']))}) "
+                f"REFERENCES {self.wrap_table(row['table'])}({self.wrap_column(row['to'])}) "
+                f"ON DELETE {row['on_delete']} ON UPDATE {row['on_update']}")
+        constraints.extend(self.foreign_key_constraintize(diff.name, diff.added_foreign_keys))
+
+        copied_columns = ', '.join(self.wrap_column(name) for name in copied)
+        return [
+            "PRAGMA foreign_keys = OFF",
+            "BEGIN",
+            f"CREATE TABLE {self.wrap_table(new_table)} ({', '.join([*columns.values(), *constraints])})",
+            f"INSERT INTO {self.wrap_table(new_table)} ({copied_columns}) "
+            f"SELECT {', '.join(self.wrap_column(name) for name in copied.values())} FROM {self.wrap_table(diff.name)} "
+            f"ORDER BY rowid",
+            f"DROP TABLE {self.wrap_table(diff.name)}",
+            f"ALTER TABLE {self.wrap_table(new_table)} RENAME TO {self.wrap_table(diff.name)}",
+            *(self.index_sql(diff.name, name, [renames.get(column, column) for column in index_columns], unique)
+              for name, (index_columns, unique) in kept_indexes.items()),
+            "COMMIT",
+            "PRAGMA foreign_keys = ON",
+        ]
+
+
+class WALSQLiteConnection(SQLiteConnection):
+    """
+    SQLite connection for single-server deployments and benchmarks (driver `sqlite_wal`).
+
+    The database is opened in WAL mode, with the `PRAGMAS` (overridable with the `pragmas` connection setting).
+    Writes are serialized on a single long-lived connection, and reads use a pool of connections, which WAL lets run
+    alongside the writer. Every connection is shared by the threads of the process.
+    """
+
+    PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'foreign_keys': 'ON',
+        'temp_store': 'MEMORY',
+        'cache_size': -16000,
+        'mmap_size': 134217728,
+    }
+
+    _writers: dict[str, sqlite3.Connection] = {}
+    _readers: dict[str, list[sqlite3.Connection]] = {}
+    _write_lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the database, with the pragmas applied"""
+        connection = sqlite3.connect(self.database, isolation_level=None, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.create_function("REGEXP", 2, regexp)
+        for pragma, value in {**self.PRAGMAS, **self.full_details.get('pragmas', {})}.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+        return connection
+
+    def _writer(self) -> sqlite3.Connection:
+        """Get the write connection to the database, opening it on first use. The write lock must be held"""
+        if self.database not in self._writers:
+            self._writers[self.database] = self._connect()
+        return self._writers[self.database]
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        """Take a read connection from the pool, opening a new one if none is free"""
+        try:
+            return self._readers.setdefault(self.database, []).pop()
+        except IndexError:
+            return self._connect()
+
+    def _release_reader(self, connection: sqlite3.Connection) -> None:
+        """Give a read connection back to the pool, or close it if the pool is full"""
+        pool = self._readers.setdefault(self.database, [])
+        if len(pool) < self.full_details.get('connection_pooling_max_size', 10):
+            pool.append(connection)
+        else:
+            connection.close()
+
+    def _is_read(self, query) -> bool:
+        """Whether a query can run on a read connection"""
+        if self.transaction_level > 0 or self.database == ':memory:' or not isinstance(query, str):
+            return False
+        statement = query.lstrip().upper()
+        return statement.startswith('SELECT') or (statement.startswith('PRAGMA') and '=' not in statement)
+
+    def make_connection(self):
+        self.open = 1
+        return self
+
+    def query(self, query, bindings=(), results="*"):
+        if self._is_read(query):
+            connection = self._acquire_reader()
+            try:
+                return self._run(connection, query, bindings, results)
+            finally:
+                self._release_reader(connection)
+        with self._write_lock:
+            return self._run(self._writer(), query, bindings, results)
+
+    def _run(self, connection: sqlite3.Connection, query, bindings, results):
+        """
+        Run a query, or a list of statements, on a connection.
+
+        :param connection: the connection to run the query on
+        :param query: the query, or a list of statements without bindings
+        :param bindings: the bindings of the query
+        :param results: 1 to return the first row only, "*" to return every row
+        :return: the rows, None for a list of statements
+        """
+
+        self._connection = connection
+        try:
+            self._cursor = connection.cursor()
+            if isinstance(query, list):
+                for statement in query:
+                    self.statement(statement)
+                return None
+            self.statement(query, bindings)
+            rows = [dict(row) for row in self._cursor.fetchall()]
+            if results == 1:
+                return rows[0] if rows else None
+            return rows
+        except Exception as e:
+            raise QueryException(str(e)) from e
+
+    def select_many(self, query, bindings, amount):
+        connection = self._acquire_reader()
+        try:
+            cursor = connection.execute(query, bindings)
+            while rows := cursor.fetchmany(amount):
+                yield [dict(row) for row in rows]
+        finally:
+            self._release_reader(connection)
+
+    def begin(self):
+        self._write_lock.acquire()
+        if self.transaction_level == 0:
+            self._writer().execute("BEGIN IMMEDIATE")
+        self.transaction_level += 1
+        return self
+
+    def commit(self):
+        self.transaction_level -= 1
+        try:
+            if self.transaction_level == 0:
+                self._writer().execute("COMMIT")
+        finally:
+            self._write_lock.release()
+        return self
+
+    def rollback(self):
+        self.transaction_level -= 1
+        try:
+            if self.transaction_level == 0:
+                self._writer().execute("ROLLBACK")
+        finally:
+            self._write_lock.release()
+        return self
+
+    @classmethod
+    def get_default_platform(cls):
+        return WALSQLitePlatform
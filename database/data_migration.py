@@ -0,0 +1,89 @@
+"""
+Helpers for the migrations that move data between tables.
+
+Loading a whole table with `all()` before inserting it elsewhere takes as much memory as the table, which doesn't
+scale with `members` or `events`. `copy_table` reads the source by primary key ranges instead (keyset pagination),
+a batch at a time, so that a migration runs in constant memory whatever the size of the table. Each batch is inserted
+with a single statement, so an interrupted copy can resume after the last key found in the target table.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Callable
+
+from masoniteorm.query import QueryBuilder
+
+__all__ = ('copy_table',)
+
+_logger = logging.getLogger(__name__)
+
+
+def copy_table(
+        source: str,
+        target: str,
+        transform: Callable[[dict], dict | None] | None = None,
+        *,
+        connection: str = 'default',
+        key: str = 'id',
+        target_key: str | None = None,
+        resume: bool = True,
+        batch_size: int = 1000,
+        sleep: float = 0.0
+) -> int:
+    """
+    Copy the rows of a table into another one, by primary key ranges.
+
+    :param source: the table to copy the rows from
+    :param target: the table to copy the rows to
+    :param transform: a function turning a source row into a target row, or None to skip the row.
+        By default, the rows are copied as-is
+    :param connection: the connection to use, e.g. the `connection` of the migration
+    :param key: the unique, integer, column of the source table the rows are read in the order of
+    :param target_key: the column of the target table holding the source `key`, defaults to `key`
+    :param resume: whether to resume after the greatest `target_key` of the target table, if it isn't empty.
+        The transformed rows must then keep the source `key` in `target_key`
+    :param batch_size: the number of rows read and inserted at a time
+    :param sleep: the time to wait between two batches, in seconds, to spare the database
+    :return: the number of rows inserted
+    """
+
+    target_key = target_key or key
+    last_key = None
+    if resume:
+        last_key = QueryBuilder().on(connection).table(target).max(target_key).first()[target_key]
+        if last_key is not None:
+            _logger.info("[MIGRATION] Resuming the copy of %s to %s after %s %s", source, target, key, last_key)
+
+    remaining = QueryBuilder().on(connection).table(source)
+    if last_key is not None:
+        remaining = remaining.where(key, '>', last_key)
+    total = remaining.count()
+
+    start = time.monotonic()
+    copied = inserted = 0
+    while True:
+        query = QueryBuilder().on(connection).table(source)
+        if last_key is not None:
+            query = query.where(key, '>', last_key)
+        rows = query.order_by(key).limit(batch_size).get().all()
+        if not rows:
+            break
+        last_key = rows[-1][key]
+
+        batch = rows if transform is None else [row for row in map(transform, rows) if row is not None]
+        if batch:
+            QueryBuilder().on(connection).table(target).bulk_create(batch)
+        copied += len(rows)
+        inserted += len(batch)
+        _logger.info("[MIGRATION] Copied %d/%d rows of %s to %s (%s %s)", copied, total, source, target, key, last_key)
+
+        if len(rows) < batch_size:
+            break
+        if sleep:
+            time.sleep(sleep)
+
+    _logger.info("[MIGRATION] Copied %s to %s: %d rows inserted in %.1fs",
+                 source, target, inserted, time.monotonic() - start)
+    return inserted
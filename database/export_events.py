@@ -0,0 +1,210 @@
+"""
+Export the events table to compressed Parquet files, for offline analysis.
+
+The table is read by primary key ranges, a batch at a time, so that the export never holds more than one file's
+worth of row groups in memory and never runs a long query against the production database. The last exported id is
+recorded in the output directory, so that an interrupted or periodic export resumes where the previous one stopped.
+
+Ids are given when the events are inserted, not when they are committed, so an event may become visible after events
+with a higher id were exported, and would then be skipped. The export therefore stops at the first event created in
+the last `margin_seconds` (by the clock of the bot, which sets `created_at`), leaving them to the next export. Events
+committing later than that after their creation are still skipped.
+
+Usage: python -m database.export_events OUTPUT_DIR [--batch-size N] [--rows-per-second N] [--rows-per-file N]
+    [--margin-seconds N]
+
+Requires pyarrow, which is not part of the bot requirements (`pip install pyarrow`).
+"""
+
+import argparse
+import datetime as dt
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault('DB_CONFIG_PATH', 'database/config.py')
+
+from masoniteorm.query import QueryBuilder
+
+_logger = logging.getLogger(__name__)
+
+STATE_FILE = 'events.state.json'
+COLUMNS = ('id', 'name', 'data', 'created_at', 'updated_at')
+
+
+def read_last_id(output_dir: Path) -> int:
+    """
+    Read the id of the last exported event.
+
+    :param output_dir: the directory the events are exported to
+    :return: the id of the last exported event, 0 if nothing has been exported yet
+    """
+
+    state_path = output_dir / STATE_FILE
+    if not state_path.exists():
+        return 0
+    with open(state_path, encoding='utf-8') as f:
+        return int(json.load(f)['last_id'])
+
+
+def write_last_id(output_dir: Path, last_id: int) -> None:
+    """
+    Atomically record the id of the last exported event.
+
+    :param output_dir: the directory the events are exported to
+    :param last_id: the id of the last exported event
+    """
+
+    tmp_path = output_dir / (STATE_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'last_id': last_id, 'exported_at': dt.datetime.now().isoformat()}, f)
+    os.replace(tmp_path, output_dir / STATE_FILE)
+
+
+def fetch_batch(last_id: int, batch_size: int) -> list[dict]:
+    """
+    Fetch the events following an id, in primary key order.
+
+    :param last_id: the id after which to fetch the events
+    :param batch_size: the maximum number of events to fetch
+    :return: the events, as dicts
+    """
+
+    return (QueryBuilder().table('events')
+            .select(*COLUMNS)
+            .where('id', '>', last_id)
+            .order_by('id')
+            .limit(batch_size)
+            .get()
+            .all())
+
+
+def _to_datetime(value: dt.datetime | str | None) -> dt.datetime | None:
+    if value is None or isinstance(value, dt.datetime):
+        return value
+    return dt.datetime.fromisoformat(str(value))
+
+
+def export(
+        output_dir: Path,
+        batch_size: int = 10_000,
+        rows_per_second: float = 0,
+        rows_per_file: int = 1_000_000,
+        compression: str = 'zstd',
+        margin_seconds: float = 60
+) -> int:
+    """
+    Export the events that haven't been exported yet, up to the first one created in the last `margin_seconds`.
+    Each file is written under a temporary name, then renamed and recorded as exported once complete,
+    so that an interrupted export leaves no partial file behind and resumes from the last complete file.
+
+    :param output_dir: the directory to export the events to
+    :param batch_size: the number of rows fetched per query, and written per row group
+    :param rows_per_second: the maximum average export rate, 0 for no limit
+    :param rows_per_file: the number of rows after which a new file is started
+    :param compression: the Parquet compression codec
+    :param margin_seconds: how long after their creation the events may commit, the more recent ones not being exported
+    :return: the number of exported rows
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ModuleNotFoundError:
+        raise SystemExit("pyarrow is required to export events: pip install pyarrow") from None
+
+    schema = pa.schema([
+        ('id', pa.uint64()),
+        ('name', pa.string()),
+        ('data', pa.string()),
+        ('created_at', pa.timestamp('us')),
+        ('updated_at', pa.timestamp('us')),
+    ])
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    last_id = read_last_id(output_dir)
+    _logger.info("Exporting events after id %d to %s", last_id, output_dir)
+
+    exported = 0
+    start = time.monotonic()
+    cutoff = dt.datetime.now() - dt.timedelta(seconds=margin_seconds)
+    writer: pq.ParquetWriter | None = None
+    file_first_id = file_rows = 0
+    tmp_path = output_dir / 'events.parquet.tmp'
+
+    def close_file() -> None:
+        nonlocal writer
+        writer.close()
+        writer = None
+        os.replace(tmp_path, output_dir / f'events_{file_first_id:020d}_{last_id:020d}.parquet')
+        write_last_id(output_dir, last_id)
+        _logger.info("Exported events %d to %d (%d rows)", file_first_id, last_id, file_rows)
+
+    try:
+        while rows := fetch_batch(last_id, batch_size):
+            recent = next((
+                i for i, row in enumerate(rows)
+                if row['created_at'] is not None and _to_datetime(row['created_at']) >= cutoff), None)
+            if recent is not None:
+                rows = rows[:recent]
+                if not rows:
+                    break
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, schema, compression=compression)
+                file_first_id, file_rows = rows[0]['id'], 0
+
+            writer.write_table(pa.table({
+                'id': [row['id'] for row in rows],
+                'name': [row['name'] for row in rows],
+                'data': [row['data'] if isinstance(row['data'], str) else json.dumps(row['data']) for row in rows],
+                'created_at': [_to_datetime(row['created_at']) for row in rows],
+                'updated_at': [_to_datetime(row['updated_at']) for row in rows],
+            }, schema=schema))
+            last_id = rows[-1]['id']
+            file_rows += len(rows)
+            exported += len(rows)
+
+            if file_rows >= rows_per_file:
+                close_file()
+            if recent is not None:
+                break
+            if rows_per_second:
+                time.sleep(max(0.0, exported / rows_per_second - (time.monotonic() - start)))
+    except BaseException:
+        # the current file is incomplete: drop it, the next export starting again from the last complete one
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+            tmp_path.unlink(missing_ok=True)
+        raise
+    if writer is not None:
+        close_file()
+
+    _logger.info("Exported %d events in %.1fs", exported, time.monotonic() - start)
+    return exported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the events table to compressed Parquet files.")
+    parser.add_argument('output_dir', type=Path, help="the directory to export the events to")
+    parser.add_argument('--batch-size', type=int, default=10_000, help="rows fetched per query (default: 10000)")
+    parser.add_argument('--rows-per-second', type=float, default=0, help="maximum export rate, 0 for none (default: 0)")
+    parser.add_argument('--rows-per-file', type=int, default=1_000_000, help="rows per Parquet file (default: 1000000)")
+    parser.add_argument('--compression', default='zstd', help="Parquet compression codec (default: zstd)")
+    parser.add_argument(
+        '--margin-seconds', type=float, default=60,
+        help="don't export the events created in the last N seconds, which may not be committed yet (default: 60)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[{asctime}] {levelname:<8} {message}", style='{')
+    export(
+        args.output_dir, args.batch_size, args.rows_per_second, args.rows_per_file, args.compression,
+        args.margin_seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,546 @@
+"""
+Immutable snapshot of the settings of a guild, as read on the message path.
+
+A masonite model resolves every attribute read through `Model.__getattr__` and its casts (the keywords are decoded
+from JSON on each access). The snapshot copies, casts and precompiles everything the link fixing needs once per
+guild load, into plain slotted attributes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass, fields, replace
+from types import MappingProxyType
+from typing import Any, Container, Iterable, Mapping, TYPE_CHECKING
+
+import discore
+
+from database.models.Guild import *
+from database.models.CustomWebsite import CustomWebsite
+from database.loader import BatchLoader
+from database.cache_sync import CacheSync
+from database.health import DBHealth, DatabaseUnavailable
+from database.routing import ReadRouting
+
+if TYPE_CHECKING:
+    from database.settings_snapshot import SettingsSnapshot
+
+__all__ = ('GuildSettings', 'CustomWebsiteSettings', 'SettingsCache', 'deep_sizeof')
+
+_logger = logging.getLogger(__name__)
+
+VIEW_COLUMNS = tuple(column for column in Guild.__casts__ if column.endswith('_view'))
+
+
+def deep_sizeof(obj: Any, seen: set[int] | None = None) -> int:
+    """
+    Approximate the memory used by an object and everything it references.
+    Objects referenced several times are only counted once.
+
+    :param obj: the object to measure
+    :param seen: the ids of the objects already counted
+    :return: the size, in bytes
+    """
+
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, re.Pattern)) or obj is None:
+        return size
+    if isinstance(obj, (dict, MappingProxyType)):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+@dataclass(frozen=True, slots=True)
+class CustomWebsiteSettings:
+    """A custom website of a guild, with its link pattern compiled."""
+
+    name: str
+    domain: str
+    fix_domain: str
+    pattern: re.Pattern[str]
+
+    @classmethod
+    def from_model(cls, website: CustomWebsite) -> CustomWebsiteSettings:
+        """
+        Build the settings of a custom website from its model.
+
+        :param website: the custom website model
+        :return: the custom website settings
+        """
+        return cls(
+            name=website.name,
+            domain=website.domain,
+            fix_domain=website.fix_domain,
+            pattern=re.compile(fr"https?://(?:www\.)?({re.escape(website.domain)})/(.+)", re.IGNORECASE),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class GuildSettings:
+    """
+    The settings of a guild, as used to fix links.
+    Item access (`settings['twitter']`, `settings['twitter_tr']`, `settings['twitter_view']`...) mirrors the one of
+    the Guild model, so the snapshot can be passed wherever a guild is only read.
+    """
+
+    id: int
+    website_flags: int
+    views: Mapping[str, GettableEnum]
+    lang: str | None
+    keywords: tuple[str, ...]
+    keywords_use_allow_list: bool
+    keyword_matcher: re.Pattern[str] | None
+    text_channels_use_allow_list: bool
+    members_use_allow_list: bool
+    roles_use_allow_list: bool
+    roles_use_any_rule: bool
+    reply_to_message: bool
+    reply_silently: bool
+    reply_as_original_author_replica: bool
+    webhooks: bool
+    original_message: OriginalMessage
+    custom_websites: tuple[CustomWebsiteSettings, ...]
+    updated_at: float
+
+    @classmethod
+    def from_guild(cls, guild: Guild, custom_websites: Iterable[CustomWebsite] | None = None) -> GuildSettings:
+        """
+        Snapshot the settings of a guild.
+
+        :param guild: the guild model
+        :param custom_websites: the custom websites of the guild, if already loaded. If None, they are loaded
+        :return: the guild settings
+        """
+
+        if custom_websites is None:
+            custom_websites = guild.custom_websites
+        keywords = tuple(guild.keywords or ())
+        return cls(
+            id=guild.id,
+            website_flags=guild.website_flags,
+            views=MappingProxyType({column.removesuffix('_view'): guild[column] for column in VIEW_COLUMNS}),
+            lang=guild.lang,
+            keywords=keywords,
+            keywords_use_allow_list=bool(guild.keywords_use_allow_list),
+            keyword_matcher=cls.compile_keywords(keywords),
+            text_channels_use_allow_list=bool(guild.text_channels_use_allow_list),
+            members_use_allow_list=bool(guild.members_use_allow_list),
+            roles_use_allow_list=bool(guild.roles_use_allow_list),
+            roles_use_any_rule=bool(guild.roles_use_any_rule),
+            reply_to_message=bool(guild.reply_to_message),
+            reply_silently=bool(guild.reply_silently),
+            reply_as_original_author_replica=bool(guild.reply_as_original_author_replica),
+            webhooks=bool(guild.webhooks),
+            original_message=guild.original_message,
+            custom_websites=tuple(CustomWebsiteSettings.from_model(website) for website in custom_websites),
+            updated_at=guild.updated_at.timestamp() if guild.updated_at else 0.0,
+        )
+
+    @classmethod
+    def default(cls, guild_id: int, profile: Mapping[str, Any] | None = None) -> GuildSettings:
+        """
+        Build the settings of a guild whose settings can't be read: the ones of a new guild, overridden by a profile.
+
+        :param guild_id: the id of the guild
+        :param profile: the settings to override, by name. Website flags (e.g. `twitter`, `twitter_tr`) take a bool,
+            `original_message` the name of its value, `keywords` a list, the other fields their value
+        :return: the guild settings
+        """
+
+        profile = dict(profile or {})
+        website_flags = DEFAULT_FLAGS
+        for name in FLAGS.keys() & profile.keys():
+            website_flags = website_flags | FLAGS[name] if profile.pop(name) else website_flags & ~FLAGS[name]
+        keywords = tuple(profile.pop('keywords', ('fxignore',)))
+        if 'original_message' in profile:
+            profile['original_message'] = OriginalMessage(profile['original_message'])
+        values = {
+            'lang': None,
+            'keywords_use_allow_list': False,
+            'text_channels_use_allow_list': False,
+            'members_use_allow_list': False,
+            'roles_use_allow_list': False,
+            'roles_use_any_rule': False,
+            'reply_to_message': False,
+            'reply_silently': True,
+            'reply_as_original_author_replica': False,
+            'webhooks': False,
+            'original_message': OriginalMessage.REMOVE_EMBEDS,
+        } | profile
+        return cls(
+            id=guild_id,
+            website_flags=website_flags,
+            views=MappingProxyType({
+                column.removesuffix('_view'): Guild.__casts__[column].NORMAL for column in VIEW_COLUMNS}),
+            keywords=keywords,
+            keyword_matcher=cls.compile_keywords(keywords),
+            custom_websites=(),
+            updated_at=0.0,
+            **values,
+        )
+
+    @staticmethod
+    def compile_keywords(keywords: tuple[str, ...]) -> re.Pattern[str] | None:
+        """
+        Compile keywords into a single pattern, matching any of them as a whole word.
+
+        :param keywords: the keywords
+        :return: the pattern, None if there are no keywords
+        """
+
+        if not keywords:
+            return None
+        # longest first, so that a keyword prefixing another one doesn't shadow it
+        alternatives = '|'.join(re.escape(k) for k in sorted(set(keywords), key=len, reverse=True))
+        return re.compile(rf"\b(?:{alternatives})\b")
+
+    def matches_keywords(self, content: str) -> bool:
+        """
+        Check whether a message contains any of the keywords of the guild.
+
+        :param content: the content of the message
+        :return: True if any keyword is found, False otherwise
+        """
+        return self.keyword_matcher is not None and self.keyword_matcher.search(content) is not None
+
+    def website_enabled(self, website_id: str) -> bool:
+        """
+        Check whether a built-in website is enabled.
+
+        :param website_id: the id of the website
+        :return: True if the website is enabled, False otherwise
+        """
+        return bool(self.website_flags & WEBSITE_FLAGS[website_id])
+
+    def translation_enabled(self, website_id: str) -> bool:
+        """
+        Check whether the translation of a built-in website is enabled.
+
+        :param website_id: the id of the website
+        :return: True if the translation is enabled, False otherwise
+        """
+        return bool(self.website_flags & TRANSLATION_FLAGS[f'{website_id}_tr'])
+
+    @property
+    def any_website_enabled(self) -> bool:
+        """Whether at least one of the built-in websites is enabled."""
+        return bool(self.website_flags & WEBSITES_MASK)
+
+    def __getitem__(self, item: str) -> Any:
+        if item in FLAGS:
+            return bool(self.website_flags & FLAGS[item])
+        if item.endswith('_view') and item.removesuffix('_view') in self.views:
+            return self.views[item.removesuffix('_view')]
+        try:
+            return getattr(self, item)
+        except AttributeError:
+            raise KeyError(item) from None
+
+    def memory_footprint(self) -> int:
+        """
+        Approximate the memory used by the snapshot, to compare it with the one of a Guild model
+        (`deep_sizeof(guild)`). Enum members and the compiled patterns are counted, although they may be shared.
+
+        :return: the size, in bytes
+        """
+        return deep_sizeof(self)
+
+    def __repr__(self) -> str:
+        return f"GuildSettings(id={self.id!r})"
+
+    def __reduce__(self):
+        state = {field.name: getattr(self, field.name) for field in fields(self)}
+        state['views'] = dict(self.views)
+        return _restore_settings, (state,)
+
+
+def _restore_settings(state: dict) -> GuildSettings:
+    """Unpickle guild settings, see `GuildSettings.__reduce__`"""
+    state['views'] = MappingProxyType(state['views'])
+    return GuildSettings(**state)
+
+
+class SettingsCache:
+    """
+    Least recently used cache of the guild settings snapshots, by guild id.
+    Entries are dropped whenever the guild or one of its custom websites is written to, and rebuilt on the next read.
+    While the database is in degraded mode, cache misses get the default profile, which isn't cached.
+    """
+
+    _entries: OrderedDict[int, GuildSettings] = OrderedDict()
+    # number of invalidations per guild, so that a bulk load started before a write doesn't cache stale settings
+    _versions: dict[int, int] = {}
+    _snapshot: SettingsSnapshot | None = None
+    # guilds whose settings were restored from the snapshot but couldn't be revalidated, retried on their next read
+    _unvalidated: set[int] = set()
+    _updated_at_loader: BatchLoader | None = None
+    _tasks: set[asyncio.Task] = set()
+    _default: GuildSettings | None = None
+
+    @classmethod
+    def max_size(cls) -> int:
+        """The maximum number of cached guilds"""
+        return (discore.config.settings_cache and discore.config.settings_cache.size) or 100_000
+
+    @classmethod
+    def default(cls, guild_id: int) -> GuildSettings:
+        """
+        Get the settings used for a guild that isn't cached while the database is unavailable,
+        from the `degraded_mode.default_profile` config.
+
+        :param guild_id: the id of the guild
+        :return: the guild settings
+        """
+
+        if cls._default is None:
+            cls._default = GuildSettings.default(
+                0, discore.config.degraded_mode and discore.config.degraded_mode.default_profile)
+        return replace(cls._default, id=guild_id)
+
+    @classmethod
+    def _fetch(cls, d_guild: discore.Guild) -> GuildSettings:
+        """
+        Load (and create, if needed) the settings of a guild. Blocking.
+
+        :param d_guild: the discord guild
+        :return: the guild settings
+        """
+        guild = Guild.find_or_create(d_guild)
+        custom_websites = CustomWebsite.on(ReadRouting.connection(guild.id)).where('guild_id', guild.id).get()
+        return GuildSettings.from_guild(guild, custom_websites)
+
+    @classmethod
+    async def get(cls, d_guild: discore.Guild) -> GuildSettings:
+        """
+        Get the settings of a guild, loading (and creating, if needed) the guild in a worker thread if they aren't
+        cached. If the database is unavailable, the default profile is returned.
+
+        :param d_guild: the discord guild
+        :return: the guild settings
+        """
+
+        settings = cls._entries.get(d_guild.id)
+        if settings is not None:
+            cls._entries.move_to_end(d_guild.id)
+            if d_guild.id in cls._unvalidated:
+                cls._unvalidated.discard(d_guild.id)
+                cls._start_revalidation(settings)
+            return settings
+
+        if cls._snapshot is not None and (settings := cls._snapshot.pop(d_guild.id)) is not None:
+            cls.put(settings)
+            cls._start_revalidation(settings)
+            return settings
+
+        version = cls._versions.get(d_guild.id, 0)
+        try:
+            settings = await DBHealth.run(cls._fetch, d_guild)
+        except DatabaseUnavailable:
+            return cls.default(d_guild.id)
+        if d_guild.id not in cls._entries and cls._versions.get(d_guild.id, 0) == version:
+            cls.put(settings)
+        return settings
+
+    @classmethod
+    def put(cls, settings: GuildSettings) -> None:
+        """
+        Cache the settings of a guild, evicting the least recently used ones if the cache is full.
+
+        :param settings: the guild settings
+        """
+
+        cls._entries[settings.id] = settings
+        cls._entries.move_to_end(settings.id)
+        while len(cls._entries) > cls.max_size():
+            cls._entries.popitem(last=False)
+
+    @classmethod
+    def invalidate(cls, guild_id: int) -> None:
+        """
+        Drop the cached settings of a guild.
+
+        :param guild_id: the id of the guild
+        """
+        cls._entries.pop(guild_id, None)
+        cls._unvalidated.discard(guild_id)
+        cls._versions[guild_id] = cls._versions.get(guild_id, 0) + 1
+        if cls._snapshot is not None:
+            cls._snapshot.discard(guild_id)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop every cached settings, including the ones of the snapshot."""
+        for guild_id in list(cls._entries):
+            cls.invalidate(guild_id)
+        if cls._snapshot is not None:
+            cls._snapshot.close()
+            cls._snapshot = None
+
+    @classmethod
+    def on_remote_change(cls, guild_id: int | None) -> None:
+        """
+        Invalidate the settings of a guild changed by another process, and make its reads stick to the main database.
+
+        :param guild_id: the id of the guild, None if any guild may have changed
+        """
+        ReadRouting.written(guild_id)
+        if guild_id is None:
+            cls.clear()
+        else:
+            cls.invalidate(guild_id)
+
+    @classmethod
+    def _fetch_many(cls, guild_ids: list[int]) -> list[GuildSettings]:
+        """
+        Load the settings of several guilds, with one query for the guilds and one for their custom websites.
+        Guilds not in the database are skipped.
+
+        :param guild_ids: the ids of the guilds
+        :return: the guild settings
+        """
+
+        connection = ReadRouting.connection(*guild_ids)
+        custom_websites: dict[int, list[CustomWebsite]] = {}
+        for website in CustomWebsite.on(connection).where_in('guild_id', guild_ids).get():
+            custom_websites.setdefault(website.guild_id, []).append(website)
+        return [
+            GuildSettings.from_guild(guild, custom_websites.get(guild.id, []))
+            for guild in Guild.on(connection).where_in('id', guild_ids).get()
+        ]
+
+    @classmethod
+    async def warm_up(cls, d_guilds: Iterable[discore.Guild], chunk_size: int = 500, concurrency: int = 2) -> int:
+        """
+        Bulk-load the settings of guilds that aren't cached yet, by chunks, in worker threads.
+        The guilds in the settings snapshot are skipped, their entries being revalidated when first used.
+        The largest guilds, which are the most likely to send messages soon, are loaded first.
+
+        :param d_guilds: the discord guilds
+        :param chunk_size: the number of guilds loaded per query
+        :param concurrency: the maximum number of chunks loaded at the same time
+        :return: the number of guilds cached
+        """
+
+        snapshot = cls._snapshot if cls._snapshot is not None else ()
+        d_guilds = sorted(
+            (d_guild for d_guild in d_guilds if d_guild.id not in cls._entries and d_guild.id not in snapshot),
+            key=lambda d_guild: d_guild.member_count or 0, reverse=True)
+        guild_ids = [d_guild.id for d_guild in d_guilds][:max(cls.max_size() - len(cls._entries) - len(snapshot), 0)]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load_chunk(chunk: list[int]) -> int:
+            async with semaphore:
+                versions = {guild_id: cls._versions.get(guild_id, 0) for guild_id in chunk}
+                try:
+                    loaded = await asyncio.to_thread(cls._fetch_many, chunk)
+                except Exception as e:
+                    _logger.warning("[CACHE] Failed to warm up %d guilds: %r", len(chunk), e)
+                    return 0
+            cached = 0
+            for settings in loaded:
+                if settings.id not in cls._entries and cls._versions.get(settings.id, 0) == versions[settings.id]:
+                    cls.put(settings)
+                    cached += 1
+            return cached
+
+        return sum(await asyncio.gather(*(
+            load_chunk(guild_ids[i:i + chunk_size]) for i in range(0, len(guild_ids), chunk_size))))
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> int:
+        """
+        Open a settings snapshot, whose entries are then used on cache misses, before querying the database.
+        Each entry is revalidated in the background when first used, against the `updated_at` of its guild.
+
+        :param path: the path of the snapshot file
+        :return: the number of guilds in the snapshot
+        """
+
+        from database.settings_snapshot import SettingsSnapshot
+        if cls._snapshot is not None:
+            cls._snapshot.close()
+        cls._snapshot = SettingsSnapshot(path)
+        return len(cls._snapshot)
+
+    @classmethod
+    async def save_snapshot(cls, path: str, guild_ids: Container[int] | None = None) -> int:
+        """
+        Write the cached settings, and the snapshot entries not used yet, to a snapshot file, in a worker thread.
+        The snapshot entries are copied beforehand, as the snapshot may be closed while the file is written.
+
+        :param path: the path of the snapshot file
+        :param guild_ids: the guilds to keep, e.g. the guilds of the bot. If None, every guild is kept
+        :return: the number of guilds written
+        """
+
+        from database.settings_snapshot import SettingsSnapshot
+        settings = [entry for entry in cls._entries.values() if guild_ids is None or entry.id in guild_ids]
+        previous_entries = cls._snapshot.raw_entries(guild_ids) if cls._snapshot is not None else None
+        return await asyncio.to_thread(SettingsSnapshot.write, path, settings, previous_entries)
+
+    @classmethod
+    def _fetch_updated_at(cls, guild_ids: list[int]) -> dict[int, float]:
+        """
+        Fetch the `updated_at` of several guilds at once.
+
+        :param guild_ids: the ids of the guilds
+        :return: the `updated_at` timestamps, by guild id
+        """
+        return {
+            guild.id: guild.updated_at.timestamp() if guild.updated_at else 0.0
+            for guild in (Guild.on(ReadRouting.connection(*guild_ids))
+                          .select('id', 'updated_at')
+                          .where_in('id', guild_ids)
+                          .get())
+        }
+
+    @classmethod
+    def _start_revalidation(cls, settings: GuildSettings) -> None:
+        """
+        Revalidate settings restored from a snapshot in the background.
+
+        :param settings: the restored settings
+        """
+        task = asyncio.create_task(cls._revalidate(settings))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @classmethod
+    async def _revalidate(cls, settings: GuildSettings) -> None:
+        """
+        Drop settings restored from a snapshot if their guild changed since the snapshot was written.
+        If the database can't be reached, the settings are kept, and revalidated again on their next read.
+
+        :param settings: the restored settings
+        """
+
+        if cls._updated_at_loader is None:
+            cls._updated_at_loader = BatchLoader(cls._fetch_updated_at)
+        try:
+            updated_at = await cls._updated_at_loader.load(settings.id)
+        except Exception:
+            if cls._entries.get(settings.id) is settings:
+                cls._unvalidated.add(settings.id)
+            return
+        if updated_at != settings.updated_at and cls._entries.get(settings.id) is settings:
+            cls._entries.pop(settings.id)
+
+
+CacheSync.subscribe('guilds', SettingsCache.on_remote_change)
@@ -0,0 +1,176 @@
+"""
+Health of the database, as seen from the message path.
+
+The lookups of the message path go through `DBHealth.run`, which runs them in a worker thread with a timeout, and
+counts the failed, timed out and slow ones. After `failure_threshold` consecutive bad lookups, the circuit opens and
+the bot enters degraded mode: lookups fail immediately, link fixing uses the cached settings (or a default profile),
+and the settings can't be edited. Every `cooldown_seconds`, one lookup is let through as a probe: the circuit closes if
+it succeeds.
+
+A timed out lookup is only abandoned: its worker thread can't be interrupted, and keeps running, with its database
+connection, until the query returns. During an outage, these threads would fill the default executor, shared with every
+other `asyncio.to_thread` user (e.g. the settings snapshot and the cache sync). At most `max_threads` lookups therefore
+run at once, timed out or not, by default half of the default executor's threads. The other lookups wait for one of
+them to return, within their timeout.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+import discore
+
+__all__ = ('DBHealth', 'DatabaseUnavailable')
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class DatabaseUnavailable(Exception):
+    """The database can't be used, either because the circuit is open or because the lookup failed or timed out"""
+
+
+class DBHealth:
+    """Latency circuit breaker on the database lookups."""
+
+    _failures: int = 0
+    _opened_at: float | None = None
+    _retry_at: float = 0.0
+    _probing: bool = False
+    # event loop and semaphore bounding the lookups running in worker threads
+    _threads: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+    @classmethod
+    def _config(cls, key: str, default: float) -> float:
+        """
+        Read a `degraded_mode` config value.
+
+        :param key: the config key
+        :param default: the value to use if the key isn't set
+        :return: the value
+        """
+        return (discore.config.degraded_mode and getattr(discore.config.degraded_mode, key, None)) or default
+
+    @classmethod
+    def degraded(cls) -> bool:
+        """Whether the circuit is open, i.e. the database is considered unavailable"""
+        return cls._opened_at is not None
+
+    @classmethod
+    async def run(cls, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run a blocking lookup in a worker thread, unless the circuit is open.
+
+        :param fn: the lookup
+        :param args: the arguments of the lookup
+        :return: the result of the lookup
+        :raise DatabaseUnavailable: if the circuit is open, or the lookup failed or timed out
+        """
+
+        probe = cls._opened_at is not None
+        if probe:
+            if cls._probing or time.monotonic() < cls._retry_at:
+                raise DatabaseUnavailable("the database is in degraded mode")
+            cls._probing = True
+
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(cls._run_in_thread(fn, *args), cls._config('timeout_ms', 2000) / 1000)
+        except Exception as e:
+            await cls._record(False)
+            raise DatabaseUnavailable(f"database lookup failed: {e!r}") from e
+        finally:
+            if probe:
+                cls._probing = False
+        await cls._record(time.monotonic() - start <= cls._config('slow_ms', 500) / 1000)
+        return result
+
+    @classmethod
+    def _thread_slots(cls) -> asyncio.Semaphore:
+        """Get the semaphore bounding the lookups running in worker threads, for the running event loop"""
+
+        loop = asyncio.get_running_loop()
+        if cls._threads is None or cls._threads[0] is not loop:
+            default = max(min(32, (os.cpu_count() or 1) + 4) // 2, 1)
+            cls._threads = (loop, asyncio.Semaphore(int(cls._config('max_threads', default))))
+        return cls._threads[1]
+
+    @classmethod
+    async def _run_in_thread(cls, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run a blocking lookup in a worker thread, once one of the `max_threads` slots is free.
+        The slot is held until the lookup returns, even if it's abandoned after a timeout.
+
+        :param fn: the lookup
+        :param args: the arguments of the lookup
+        :return: the result of the lookup
+        """
+
+        loop = asyncio.get_running_loop()
+        slots = cls._thread_slots()
+        await slots.acquire()
+        lock = threading.Lock()
+        started = abandoned = False
+
+        def release() -> None:
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                # the event loop is closed
+                pass
+
+        def call() -> T:
+            nonlocal started
+            with lock:
+                if abandoned:
+                    return None
+                started = True
+            try:
+                return fn(*args)
+            finally:
+                release()
+
+        try:
+            return await asyncio.to_thread(call)
+        except asyncio.CancelledError:
+            # the thread won't run the lookup if it hasn't started yet, and won't release the slot either
+            with lock:
+                if not started:
+                    abandoned = True
+                    slots.release()
+            raise
+
+    @classmethod
+    async def _record(cls, ok: bool) -> None:
+        """
+        Record the outcome of a lookup, opening or closing the circuit if needed.
+
+        :param ok: whether the lookup succeeded in time
+        """
+
+        from database.models.Event import Event
+
+        now = time.monotonic()
+        if ok:
+            cls._failures = 0
+            if cls._opened_at is not None:
+                duration = now - cls._opened_at
+                cls._opened_at = None
+                _logger.warning("[DATABASE] Leaving degraded mode after %.0f seconds", duration)
+                await Event.buff_cr({'name': 'degraded_mode_exit', 'data': {'duration': round(duration)}})
+            return
+
+        cls._failures += 1
+        if cls._opened_at is not None:
+            cls._retry_at = now + cls._config('cooldown_seconds', 30)
+        elif cls._failures >= cls._config('failure_threshold', 5):
+            cls._opened_at = now
+            cls._retry_at = now + cls._config('cooldown_seconds', 30)
+            _logger.warning("[DATABASE] Entering degraded mode after %d failed or slow lookups", cls._failures)
+            await Event.buff_cr({'name': 'degraded_mode_enter', 'data': {'failures': cls._failures}})
@@ -0,0 +1,111 @@
+"""
+Dataloader-style batching of database lookups.
+
+During message bursts, many handlers look up rows of the same table within a few milliseconds. A BatchLoader collects
+the keys requested during a short window (or until enough keys are pending), fetches them all with one query in a
+worker thread, and resolves the future of each caller with its own row.
+The fetches go through the database circuit breaker, see `database.health`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable, Generic, Hashable, Iterable, TypeVar
+
+import discore
+
+from database.health import DBHealth
+
+__all__ = ('BatchLoader',)
+
+_logger = logging.getLogger(__name__)
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class BatchLoader(Generic[K, V]):
+    """Batches the lookups of rows by key, within a time window."""
+
+    def __init__(self, fetch: Callable[[list[K]], dict[K, V]], window: float | None = None, max_keys: int | None = None):
+        """
+        :param fetch: a blocking function fetching the rows of a list of keys, returning them by key.
+            Keys with no row are simply absent from the returned dict
+        :param window: the maximum time, in seconds, a lookup waits for other lookups to batch with.
+            Defaults to the `db_batching.window_ms` config
+        :param max_keys: the number of pending keys that triggers a fetch before the end of the window.
+            Defaults to the `db_batching.max_keys` config
+        """
+
+        config = discore.config.db_batching
+        self.fetch = fetch
+        self.window: float = window if window is not None else ((config and config.window_ms) or 2) / 1000
+        self.max_keys: int = max_keys or (config and config.max_keys) or 100
+        self._pending: dict[K, list[asyncio.Future[V | None]]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, key: K) -> V | None:
+        """
+        Get the row of a key, batched with the other lookups of the window.
+
+        :param key: the key to look up
+        :return: the row, None if there is none
+        :raise DatabaseUnavailable: if the database is in degraded mode, or the fetch failed
+        """
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append(future)
+        if len(self._pending) >= self.max_keys:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+        return await future
+
+    async def load_many(self, keys: Iterable[K]) -> list[V | None]:
+        """
+        Get the rows of several keys, batched with the other lookups of the window.
+
+        :param keys: the keys to look up
+        :return: the rows, in the order of the keys, None for the keys with no row
+        """
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        """Start fetching the pending keys"""
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        task = asyncio.create_task(self._resolve(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, batch: dict[K, list[asyncio.Future[V | None]]]) -> None:
+        """
+        Fetch a batch of keys and resolve the futures waiting for them.
+
+        :param batch: the futures waiting for each key
+        """
+
+        try:
+            rows = await DBHealth.run(self.fetch, list(batch))
+        except Exception as e:
+            if not DBHealth.degraded():
+                _logger.warning("Batched lookup of %d keys failed: %r", len(batch), e)
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for key, futures in batch.items():
+            row = rows.get(key)
+            for future in futures:
+                if not future.done():
+                    future.set_result(row)
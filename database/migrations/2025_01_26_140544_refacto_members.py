@@ -1,7 +1,8 @@
 """RefactoMembers Migration."""
 
 from masoniteorm.migrations import Migration
-from masoniteorm.query import QueryBuilder
+
+from database.data_migration import copy_table
 
 
 class RefactoMembers(Migration):
@@ -10,45 +11,38 @@ class RefactoMembers(Migration):
         Run the migrations.
         """
 
-        self.schema.rename("members", "old_members")
+        # if `old_members` exists, a previous run was interrupted while copying, and the copy resumes
+        if not self.schema.has_table("old_members"):
+            self.schema.rename("members", "old_members")
 
-        with self.schema.table("old_members") as table:
-            table.drop_foreign("members_guild_id_foreign")
-            table.drop_index("members_guild_id_index")
-            table.drop_unique("members_id_unique")
+            with self.schema.table("old_members") as table:
+                table.drop_foreign("members_guild_id_foreign")
+                table.drop_index("members_guild_id_index")
+                table.drop_unique("members_id_unique")
 
-        with self.schema.create("members") as table:
-            table.increments("id").primary().unique()
+        if not self.schema.has_table("members"):
+            with self.schema.create("members") as table:
+                table.increments("id").primary().unique()
 
-            table.big_integer("user_id").unsigned().index()
+                table.big_integer("user_id").unsigned().index()
 
-            table.big_integer("guild_id").unsigned().index()
-            table.foreign("guild_id").references("id").on("guilds").on_delete("cascade")
+                table.big_integer("guild_id").unsigned().index()
+                table.foreign("guild_id").references("id").on("guilds").on_delete("cascade")
 
-            table.boolean("enabled").default(True)
+                table.boolean("enabled").default(True)
 
-            table.timestamps()
-
-        old_members = QueryBuilder().on(self.connection).table('old_members')
-        members = QueryBuilder().on(self.connection).table('members')
+                table.timestamps()
 
-        members_to_create = [
-            {
+        copy_table(
+            "old_members", "members",
+            lambda member: {
                 "user_id": member["id"],
                 "guild_id": member["guild_id"],
                 "enabled": member["enabled"],
                 "created_at": member["created_at"],
                 "updated_at": member["updated_at"],
-            }
-            for member in old_members.all()
-        ]
-        members_to_create_batches = [
-            members_to_create[i:i + 1000]
-            for i in range(0, len(members_to_create), 1000)
-        ]
-
-        for batch in members_to_create_batches:
-            members.bulk_create(batch)
+            },
+            connection=self.connection, target_key="user_id")
 
         self.schema.drop("old_members")
 
@@ -57,12 +51,17 @@ class RefactoMembers(Migration):
         Revert the migrations.
         """
 
-        self.schema.rename("members", "new_members")
+        if self.schema.has_table("new_members"):
+            # a previous run was interrupted while copying: the new members ids can't be recovered from the old
+            # table, so the copy restarts from the beginning
+            self.schema.drop_table_if_exists("members")
+        else:
+            self.schema.rename("members", "new_members")
 
-        with self.schema.table("new_members") as table:
-            table.drop_foreign("members_guild_id_foreign")
-            table.drop_index("members_guild_id_index")
-            table.drop_unique("members_id_unique")
+            with self.schema.table("new_members") as table:
+                table.drop_foreign("members_guild_id_foreign")
+                table.drop_index("members_guild_id_index")
+                table.drop_unique("members_id_unique")
 
         with self.schema.create("members") as table:
             table.big_integer("id").unsigned().unique()
@@ -74,25 +73,15 @@ class RefactoMembers(Migration):
 
             table.timestamps()
 
-        new_members = QueryBuilder().on(self.connection).table('new_members')
-        members = QueryBuilder().on(self.connection).table('members')
-
-        members_to_create = [
-            {
+        copy_table(
+            "new_members", "members",
+            lambda member: {
                 "id": member["user_id"],
                 "guild_id": member["guild_id"],
                 "enabled": member["enabled"],
                 "created_at": member["created_at"],
                 "updated_at": member["updated_at"],
-            }
-            for member in new_members.all()
-        ]
-        members_to_create_batches = [
-            members_to_create[i:i + 1000]
-            for i in range(0, len(members_to_create), 1000)
-        ]
-
-        for batch in members_to_create_batches:
-            members.bulk_create(batch)
+            },
+            connection=self.connection, resume=False)
 
         self.schema.drop("new_members")
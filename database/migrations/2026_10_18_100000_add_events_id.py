@@ -0,0 +1,27 @@
+"""AddEventsId Migration."""
+
+from masoniteorm.migrations import Migration
+from masoniteorm.query import QueryBuilder
+
+
+class AddEventsId(Migration):
+    def up(self):
+        """
+        Run the migrations.
+        """
+        if self.schema.connection_class.name == 'sqlite':
+            with self.schema.table("events") as table:
+                table.big_increments("id")
+        else:
+            QueryBuilder().on(self.connection).table('events').statement(
+                'ALTER TABLE `events` ADD `id` BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY FIRST')
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        if self.schema.connection_class.name == 'sqlite':
+            with self.schema.table("events") as table:
+                table.drop_column("id")
+        else:
+            QueryBuilder().on(self.connection).table('events').statement('ALTER TABLE `events` DROP COLUMN `id`')
@@ -0,0 +1,27 @@
+"""UniqueMembers Migration."""
+
+from masoniteorm.migrations import Migration
+
+
+class UniqueMembers(Migration):
+    def up(self):
+        """
+        Run the migrations.
+        """
+        with self.schema.table("members") as table:
+            # keep the oldest row of each (user_id, guild_id) pair, duplicated by past find_or_create races
+            if self.schema.connection_class.name == 'sqlite':
+                table.connection.query(
+                    r'DELETE FROM `members` WHERE `id` NOT IN (SELECT MIN(`id`) FROM `members` GROUP BY `user_id`, `guild_id`)')
+            else:
+                table.connection.query(
+                    r'DELETE `m1` FROM `members` `m1` JOIN `members` `m2` '
+                    r'ON `m1`.`user_id` = `m2`.`user_id` AND `m1`.`guild_id` = `m2`.`guild_id` AND `m1`.`id` > `m2`.`id`')
+            table.unique(["user_id", "guild_id"], name="members_user_id_guild_id_unique")
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        with self.schema.table("members") as table:
+            table.drop_unique("members_user_id_guild_id_unique")
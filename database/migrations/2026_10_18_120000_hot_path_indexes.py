@@ -0,0 +1,35 @@
+"""HotPathIndexes Migration."""
+
+from masoniteorm.migrations import Migration
+
+
+class HotPathIndexes(Migration):
+    def up(self):
+        """
+        Run the migrations.
+        """
+        with self.schema.table("members") as table:
+            # the (user_id, guild_id) lookup of every message is answered from the index alone,
+            # instead of following the primary key to the row
+            table.drop_index("members_user_id_index")
+            table.index(
+                ["user_id", "guild_id", "on_deny_list", "on_allow_list"],
+                name="members_user_id_guild_id_lists_index")
+
+        with self.schema.table("events") as table:
+            table.string("name", 64).change()
+            table.index(["name", "created_at"], name="events_name_created_at_index")
+            table.index("created_at", name="events_created_at_index")
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        with self.schema.table("members") as table:
+            table.drop_index("members_user_id_guild_id_lists_index")
+            table.index("user_id", name="members_user_id_index")
+
+        with self.schema.table("events") as table:
+            table.drop_index("events_name_created_at_index")
+            table.drop_index("events_created_at_index")
+            table.text("name").change()
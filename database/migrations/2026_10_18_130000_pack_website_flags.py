@@ -0,0 +1,93 @@
+"""PackWebsiteFlags Migration."""
+
+from masoniteorm.migrations import Migration
+from masoniteorm.query import QueryBuilder
+
+# frozen copy of the bits of database.models.Guild.FLAGS, and the defaults of the columns they replace
+FLAGS = {
+    'twitter': (1 << 0, True),
+    'instagram': (1 << 1, True),
+    'tiktok': (1 << 2, True),
+    'reddit': (1 << 3, True),
+    'threads': (1 << 4, True),
+    'bluesky': (1 << 5, True),
+    'pixiv': (1 << 6, True),
+    'ifunny': (1 << 7, True),
+    'furaffinity': (1 << 8, True),
+    'youtube': (1 << 9, False),
+    'snapchat': (1 << 10, True),
+    'mastodon': (1 << 11, False),
+    'deviantart': (1 << 12, True),
+    'tumblr': (1 << 13, False),
+    'facebook': (1 << 14, True),
+    'bilibili': (1 << 15, True),
+    'twitch': (1 << 16, True),
+    'spotify': (1 << 17, False),
+    'imgur': (1 << 18, False),
+    'weibo': (1 << 19, True),
+    'imageboards': (1 << 20, True),
+    'pinterest': (1 << 21, True),
+    'newgrounds': (1 << 22, True),
+    'twitter_tr': (1 << 32, False),
+    'instagram_tr': (1 << 33, False),
+    'snapchat_tr': (1 << 34, False),
+    'ifunny_tr': (1 << 35, False),
+    'imgur_tr': (1 << 36, False),
+    'weibo_tr': (1 << 37, False),
+    'pinterest_tr': (1 << 38, False),
+}
+DEFAULT_FLAGS = sum(bit for bit, default in FLAGS.values() if default)
+BATCH_SIZE = 1000
+
+
+class PackWebsiteFlags(Migration):
+    def id_ranges(self):
+        """
+        Split the guilds ids in consecutive ranges of at most BATCH_SIZE guilds,
+        so that each conversion query only locks a bounded number of rows.
+
+        :return: an iterator over the (first id, last id) ranges
+        """
+        last_id = 0
+        while True:
+            ids = [
+                row['id'] for row in
+                QueryBuilder().on(self.connection).table('guilds')
+                .select('id').where('id', '>', last_id).order_by('id').limit(BATCH_SIZE).get()
+            ]
+            if not ids:
+                return
+            yield ids[0], ids[-1]
+            last_id = ids[-1]
+
+    def up(self):
+        """
+        Run the migrations.
+        """
+        with self.schema.table("guilds") as table:
+            table.big_integer("website_flags").unsigned().default(DEFAULT_FLAGS).after("id")
+
+        packed = ' + '.join(f"(CASE WHEN `{column}` THEN {bit} ELSE 0 END)" for column, (bit, _) in FLAGS.items())
+        for first_id, last_id in self.id_ranges():
+            QueryBuilder().on(self.connection).table('guilds').statement(
+                f"UPDATE `guilds` SET `website_flags` = {packed} WHERE `id` BETWEEN {first_id} AND {last_id}")
+
+        with self.schema.table("guilds") as table:
+            for column in FLAGS:
+                table.drop_column(column)
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        with self.schema.table("guilds") as table:
+            for column, (_, default) in FLAGS.items():
+                table.boolean(column).default(default)
+
+        unpacked = ', '.join(f"`{column}` = (`website_flags` & {bit}) <> 0" for column, (bit, _) in FLAGS.items())
+        for first_id, last_id in self.id_ranges():
+            QueryBuilder().on(self.connection).table('guilds').statement(
+                f"UPDATE `guilds` SET {unpacked} WHERE `id` BETWEEN {first_id} AND {last_id}")
+
+        with self.schema.table("guilds") as table:
+            table.drop_column("website_flags")
@@ -0,0 +1,24 @@
+"""CreateCacheInvalidations Migration."""
+
+from masoniteorm.migrations import Migration
+
+
+class CreateCacheInvalidations(Migration):
+    def up(self):
+        """
+        Run the migrations.
+        """
+        with self.schema.create("cache_invalidations") as table:
+            table.big_increments("id")
+            table.string("origin", 32)
+            table.string("table_name", 64)
+            table.big_integer("guild_id").unsigned().nullable()
+            table.timestamps()
+
+            table.index("created_at")
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        self.schema.drop("cache_invalidations")
@@ -0,0 +1,21 @@
+"""CreateSchemaVersion Migration."""
+
+from masoniteorm.migrations import Migration
+
+
+class CreateSchemaVersion(Migration):
+    def up(self):
+        """
+        Run the migrations.
+        """
+        with self.schema.create("schema_version") as table:
+            table.integer("id").primary()
+            table.string("migrations_hash", 64)
+            table.integer("migrate_ms").unsigned()
+            table.timestamps()
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        self.schema.drop("schema_version")
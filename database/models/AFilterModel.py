@@ -5,6 +5,10 @@ from typing import TYPE_CHECKING, Self
 from masoniteorm.relationships import belongs_to
 
 from database.models.DiscordRepresentation import DiscordRepresentation
+from database.loader import BatchLoader
+from database.health import DatabaseUnavailable
+from database.routing import ReadRouting
+from database.upsert import insert_ignore
 
 if TYPE_CHECKING:
     from database.models.Guild import Guild
@@ -44,18 +48,18 @@ class AFilterModel(DiscordRepresentation):
         :param kwargs: Additional keyword arguments for creating the element if it does not exist.
         :return: An instance of the element if found or created, otherwise None.
         """
-        element = cls.find(d_element.id)
+        element = cls.on(ReadRouting.connection(d_element.guild.id)).find(d_element.id)
         if element:
             return element
 
         if guild is None:
             from database.models.Guild import Guild
             guild = Guild.find_or_create(d_element.guild, **(guild_kwargs or {}))
-        return cls.create({
+        return insert_ignore(cls, {
             'id': d_element.id,
             'guild_id': guild.id,
             **kwargs
-        }).fresh()
+        }) or cls.find(d_element.id)
 
     @classmethod
     def reset_lists(cls, guild: Guild) -> None:
@@ -67,6 +71,7 @@ class AFilterModel(DiscordRepresentation):
             'on_allow_list': False,
             'on_deny_list': False
         })
+        ReadRouting.written(guild.id)
 
     def enabled(self, guild: Guild = None) -> bool:
         """
@@ -96,13 +101,59 @@ class AFilterModel(DiscordRepresentation):
 
         if not guild:
             return True
-        element = cls.find(d_element.id)
+        element = cls.on(ReadRouting.connection(guild.id)).find(d_element.id)
         if element:
             return element.enabled(guild)
         if guild[f'{cls.__table__}_use_allow_list']:
             return False
         return True
 
+    @classmethod
+    def loader(cls) -> BatchLoader:
+        """
+        Get the loader batching the lookups of this model's list flags, creating it on first use.
+        """
+        if '_loader' not in cls.__dict__:
+            cls._loader = BatchLoader(cls._fetch_lists)
+        return cls._loader
+
+    @classmethod
+    def _fetch_lists(cls, ids: list[int]) -> dict[int, Self]:
+        """
+        Fetch the list flags of several elements at once.
+
+        :param ids: the ids of the elements
+        :return: the elements found, by id
+        """
+        return {
+            element.id: element
+            for element in (cls.on(ReadRouting.connection())
+                            .select('id', 'guild_id', 'on_deny_list', 'on_allow_list')
+                            .where_in('id', ids)
+                            .get())
+        }
+
+    @classmethod
+    async def load_get_enabled(cls, d_element: GuildChild, guild: Guild | None = None) -> bool:
+        """
+        Same as `find_get_enabled`, but the lookup is batched with the concurrent ones and run in a worker thread.
+        If the database is unavailable, the element is considered not to be on any list.
+
+        :param d_element: The discore element to find (e.g., Member, Role, TextChannel).
+        :param guild: The guild to check the element in.
+        :return: True if the element is enabled, False otherwise
+        """
+
+        if not guild:
+            return True
+        try:
+            element = await cls.loader().load(d_element.id)
+        except DatabaseUnavailable:
+            element = None
+        if element:
+            return element.enabled(guild)
+        return not guild[f'{cls.__table__}_use_allow_list']
+
     def on_list(self, guild: Guild = None) -> bool:
         """
         Check if the element is on the allow or deny list.
@@ -130,3 +181,4 @@ class AFilterModel(DiscordRepresentation):
             self.update({'on_allow_list': enabled})
         else:
             self.update({'on_deny_list': not enabled})
+        ReadRouting.written(guild.id)
@@ -3,6 +3,8 @@
 from masoniteorm.models import Model
 from masoniteorm.relationships import belongs_to
 
+from database.upsert import insert_ignore
+
 
 class CustomWebsite(Model):
     """CustomWebsite Model"""
@@ -23,5 +25,5 @@ class CustomWebsite(Model):
                 guild = guild_id
             else:
                 guild = Guild.find_or_create(guild_id, **(guild_kwargs or {}))
-            website = cls.create({'id': website_id, 'guild_id': guild.id, **kwargs}).fresh()
+            website = insert_ignore(cls, {'id': website_id, 'guild_id': guild.id, **kwargs}) or cls.find(website_id)
         return website
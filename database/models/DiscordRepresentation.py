@@ -5,6 +5,8 @@ from typing import TYPE_CHECKING, Self
 import discore
 from masoniteorm.models import Model
 
+from database.upsert import insert_ignore
+
 if TYPE_CHECKING:
     from database.models.Guild import Guild
 
@@ -32,7 +34,7 @@ class DiscordRepresentation(Model):
         if element:
             return element
 
-        return cls.create({
+        return insert_ignore(cls, {
             'id': d_element.id,
             **kwargs
-        }).fresh()
+        }) or cls.find(d_element.id)
@@ -1,14 +1,24 @@
 """ Event Model """
 
 import asyncio
-from typing import Self
+import logging
+from typing import Self, Iterable
 import datetime as dt
 import json
 
 from masoniteorm.models import Model
+from masoniteorm.query import QueryBuilder
 
 import discore
 
+from database.routing import ReadRouting
+
+FIX_EVENTS = ('fixed_link', 'fixed_link_no_embed', 'fixed_link_not_sent')
+FIX_ERROR_EVENTS = ('fixed_link_no_embed', 'fixed_link_not_sent')
+
+_logger = logging.getLogger(__name__)
+
+
 class Event(Model):
     """Event Model"""
 
@@ -16,6 +26,67 @@ class Event(Model):
     _buffer = []
     _flush_task: asyncio.Task | None = None
     _lock: asyncio.Lock = asyncio.Lock()
+    # maximum number of events kept while the database is unavailable, the oldest ones being dropped first
+    _max_buffer = 10_000
+
+    _bucket_sizes = {'hour': 13, 'day': 10}
+
+    @classmethod
+    def _filter(
+            cls,
+            query: QueryBuilder | type[Self],
+            event_name: str | Iterable[str] | None = None,
+            days: int = 0,
+            hours: int = 0,
+            minutes: int = 0,
+            seconds: int = 0
+    ) -> QueryBuilder | type[Self]:
+        """
+        Restrict a query to the given event name(s) and to the events created since a certain time.
+        If the time is 0, don't restrict the time.
+
+        :param query: the query to restrict
+        :param event_name: the name, or names, of the events to filter by
+        :param days: the number of days
+        :param hours: the number of hours
+        :param minutes: the number of minutes
+        :param seconds: the number of seconds
+        :return: the restricted query
+        """
+
+        if isinstance(event_name, str):
+            query = query.where('name', event_name)
+        elif event_name:
+            query = query.where_in('name', list(event_name))
+
+        delta = dt.timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
+        if delta:
+            query = query.where('created_at', '>=', dt.datetime.now() - delta)
+        return query
+
+    @classmethod
+    def _raw(cls) -> QueryBuilder:
+        """
+        Get a query builder on the events table that returns raw rows instead of models.
+        The events are read from the replica, if any.
+
+        :return: the query builder
+        """
+
+        return QueryBuilder(connection=ReadRouting.connection(sticky=False)).table(cls.__table__)
+
+    @classmethod
+    def _link_id_sql(cls, query: QueryBuilder) -> str:
+        """
+        Get the SQL expression extracting the website id (`link.id` in the event data), in the dialect of a query.
+
+        :param query: the query the expression is used in
+        :return: the SQL expression
+        """
+
+        if query.connection_class.name == 'sqlite':
+            return "json_extract(data, '$.link.id')"
+        return "JSON_VALUE(data, '$.link.id')"
 
     @classmethod
     def since(cls, event_name: str | None = None, days: int = 0, hours: int = 0, minutes: int = 0, seconds: int = 0) -> list[Self]:
@@ -35,23 +106,145 @@ class Event(Model):
         if not discore.config.analytic:
             return []
 
-        query = cls.where('name', event_name) if event_name else cls
+        return cls._filter(cls.on(ReadRouting.connection(sticky=False)), event_name, days, hours, minutes, seconds).get()
 
-        delta = dt.timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
-        if delta:
-            query = query.where('created_at', '>=', dt.datetime.now() - delta)
+    @classmethod
+    def count_since(cls, event_name: str | Iterable[str] | None = None, **delta: int) -> int:
+        """
+        Count the events since a certain time, with an optional filter by event name(s).
+
+        :param event_name: the name, or names, of the events to count
+        :param delta: the time to look back, as `days`, `hours`, `minutes` and `seconds`
+        :return: the number of events
+        """
+
+        if not discore.config.analytic:
+            return 0
+
+        return int(cls._filter(cls._raw(), event_name, **delta).count() or 0)
+
+    @classmethod
+    def counts_by_name(cls, event_name: str | Iterable[str] | None = None, **delta: int) -> dict[str, int]:
+        """
+        Count the events since a certain time, grouped by event name.
+
+        :param event_name: the name, or names, of the events to count
+        :param delta: the time to look back, as `days`, `hours`, `minutes` and `seconds`
+        :return: the number of events per event name
+        """
+
+        if not discore.config.analytic:
+            return {}
+
+        rows = (cls._filter(cls._raw(), event_name, **delta)
+                .select_raw("name, COUNT(*) AS total")
+                .group_by('name')
+                .get())
+        return {row['name']: int(row['total']) for row in rows}
+
+    @classmethod
+    def counts_by_bucket(
+            cls,
+            event_name: str | Iterable[str] | None = None,
+            bucket: str = 'hour',
+            **delta: int
+    ) -> dict[str, int]:
+        """
+        Count the events since a certain time, grouped by time bucket.
+
+        :param event_name: the name, or names, of the events to count
+        :param bucket: the size of the buckets, either 'hour' or 'day'
+        :param delta: the time to look back, as `days`, `hours`, `minutes` and `seconds`
+        :return: the number of events per bucket, ordered chronologically.
+            Buckets are formatted as 'YYYY-MM-DD HH' or 'YYYY-MM-DD'
+        """
+
+        if bucket not in cls._bucket_sizes:
+            raise ValueError(f"Unknown bucket {bucket!r}, expected one of {', '.join(cls._bucket_sizes)}")
+        if not discore.config.analytic:
+            return {}
 
-        return query.get()
+        rows = (cls._filter(cls._raw(), event_name, **delta)
+                .select_raw(f"SUBSTR(created_at, 1, {cls._bucket_sizes[bucket]}) AS bucket, COUNT(*) AS total")
+                .group_by_raw('bucket')
+                .order_by('bucket')
+                .get())
+        return {str(row['bucket']): int(row['total']) for row in rows}
+
+    @classmethod
+    def counts_by_link(cls, event_name: str | Iterable[str] | None = None, **delta: int) -> dict[str, dict[str, int]]:
+        """
+        Count the events since a certain time, grouped by website (`link.id` in the event data) and event name.
+        Events without a link are ignored.
+
+        :param event_name: the name, or names, of the events to count
+        :param delta: the time to look back, as `days`, `hours`, `minutes` and `seconds`
+        :return: the number of events per event name, per website
+        """
+
+        if not discore.config.analytic:
+            return {}
+
+        query = cls._raw()
+        link_id = cls._link_id_sql(query)
+        rows = (cls._filter(query, event_name, **delta)
+                .select_raw(f"{link_id} AS link_id, name, COUNT(*) AS total")
+                .where_raw(f"{link_id} IS NOT NULL")
+                .group_by_raw('link_id, name')
+                .get())
+        counts: dict[str, dict[str, int]] = {}
+        for row in rows:
+            counts.setdefault(row['link_id'], {})[row['name']] = int(row['total'])
+        return counts
+
+    @classmethod
+    def error_ratios(cls, **delta: int) -> dict[str, tuple[int, int, float]]:
+        """
+        Compute, per website, the number of link fix attempts, the number of failed ones,
+        and the failure ratio, since a certain time.
+
+        :param delta: the time to look back, as `days`, `hours`, `minutes` and `seconds`
+        :return: a (attempts, failures, failure ratio) tuple per website, sorted by decreasing attempts
+        """
+
+        if not discore.config.analytic:
+            return {}
+
+        failed = ', '.join(f"'{name}'" for name in FIX_ERROR_EVENTS)
+        query = cls._raw()
+        link_id = cls._link_id_sql(query)
+        rows = (cls._filter(query, FIX_EVENTS, **delta)
+                .select_raw(
+                    f"{link_id} AS link_id, COUNT(*) AS total, "
+                    f"SUM(CASE WHEN name IN ({failed}) THEN 1 ELSE 0 END) AS failed")
+                .where_raw(f"{link_id} IS NOT NULL")
+                .group_by_raw('link_id')
+                .order_by_raw('total DESC')
+                .get())
+        return {
+            row['link_id']: (int(row['total']), int(row['failed']), int(row['failed']) / int(row['total']))
+            for row in rows
+        }
 
     @classmethod
     async def _flush_loop(cls) -> None:
-        """Flush the buffer every 5 seconds"""
+        """
+        Flush the buffer every 5 seconds, in a worker thread.
+        If the flush fails, the events are kept for the next one.
+        """
         while True:
             await asyncio.sleep(5)
             async with cls._lock:
-                if cls._buffer:
-                    cls.bulk_create(cls._buffer)
-                    cls._buffer.clear()
+                events, cls._buffer = cls._buffer, []
+            if not events:
+                continue
+            try:
+                await asyncio.to_thread(cls.bulk_create, events)
+            except Exception as e:
+                _logger.warning("Failed to flush %d events: %r", len(events), e)
+                async with cls._lock:
+                    cls._buffer[:0] = events
+                    del cls._buffer[:-cls._max_buffer]
 
     @classmethod
     async def buff_cr(cls, *events: dict) -> None:
@@ -1,15 +1,64 @@
 """ Guild Model """
 import discore
 
+from datetime import datetime
 from enum import Enum
 from typing import Self
 
+from masoniteorm.expressions import Raw
 from masoniteorm.relationships import has_many
 
 
-__all__ = ('Guild', 'OriginalMessage', 'FxEmbedView', 'InstagramView', 'TiktokView', 'EmbedEzView', 'GettableEnum')
+__all__ = (
+    'Guild', 'OriginalMessage', 'FxEmbedView', 'InstagramView', 'TiktokView', 'EmbedEzView', 'GettableEnum',
+    'WEBSITE_FLAGS', 'TRANSLATION_FLAGS', 'FLAGS', 'WEBSITES_MASK', 'DEFAULT_FLAGS')
 
 from database.models.DiscordRepresentation import DiscordRepresentation
+from database.upsert import insert_ignore
+from database.cache_sync import CacheSync
+from database.routing import ReadRouting
+
+
+# Bits of the `website_flags` column. Bits are never reused nor moved: new websites take the next free bit.
+WEBSITE_FLAGS = {
+    'twitter': 1 << 0,
+    'instagram': 1 << 1,
+    'tiktok': 1 << 2,
+    'reddit': 1 << 3,
+    'threads': 1 << 4,
+    'bluesky': 1 << 5,
+    'pixiv': 1 << 6,
+    'ifunny': 1 << 7,
+    'furaffinity': 1 << 8,
+    'youtube': 1 << 9,
+    'snapchat': 1 << 10,
+    'mastodon': 1 << 11,
+    'deviantart': 1 << 12,
+    'tumblr': 1 << 13,
+    'facebook': 1 << 14,
+    'bilibili': 1 << 15,
+    'twitch': 1 << 16,
+    'spotify': 1 << 17,
+    'imgur': 1 << 18,
+    'weibo': 1 << 19,
+    'imageboards': 1 << 20,
+    'pinterest': 1 << 21,
+    'newgrounds': 1 << 22,
+}
+TRANSLATION_FLAGS = {
+    'twitter_tr': 1 << 32,
+    'instagram_tr': 1 << 33,
+    'snapchat_tr': 1 << 34,
+    'ifunny_tr': 1 << 35,
+    'imgur_tr': 1 << 36,
+    'weibo_tr': 1 << 37,
+    'pinterest_tr': 1 << 38,
+}
+FLAGS = WEBSITE_FLAGS | TRANSLATION_FLAGS
+WEBSITES_MASK = sum(WEBSITE_FLAGS.values())
+DEFAULT_FLAGS = WEBSITES_MASK & ~(
+    WEBSITE_FLAGS['youtube'] | WEBSITE_FLAGS['mastodon'] | WEBSITE_FLAGS['tumblr']
+    | WEBSITE_FLAGS['spotify'] | WEBSITE_FLAGS['imgur'])
 
 
 class GettableEnum(Enum):
@@ -53,6 +102,7 @@ class Guild(DiscordRepresentation):
     __table__ = "guilds"
 
     __casts__ = {
+        'website_flags': int,
         'keywords': 'json',
         'keywords_use_allow_list': bool,
         'text_channels_use_allow_list': bool,
@@ -93,7 +143,56 @@ class Guild(DiscordRepresentation):
 
     @classmethod
     def find_or_create(cls, d_guild: discore.Guild, **kwargs):
-        guild = cls.find(d_guild.id)
+        guild = cls.on(ReadRouting.connection(d_guild.id)).find(d_guild.id)
         if guild is None:
-            guild = cls.create({'id': d_guild.id, **kwargs}).fresh()
+            guild = insert_ignore(cls, {'id': d_guild.id, **kwargs}) or cls.find(d_guild.id)
         return guild
+
+    def __getattr__(self, attribute):
+        """
+        Expose each bit of `website_flags` as a boolean attribute, named after the column it replaced,
+        so that `guild['twitter']` or `guild['twitter_tr']` keep working.
+        """
+        if attribute in FLAGS:
+            return bool(self.website_flags & FLAGS[attribute])
+        return super().__getattr__(attribute)
+
+    def update(self, updates: dict, *args, **kwargs):
+        """
+        Update the guild, packing any website or translation state into `website_flags` (then re-read),
+        drop its cached settings, in this process and the others, and make its reads stick to the main database.
+
+        :param updates: the columns to update, website and translation states included
+        :return: the result of the update query
+        """
+        flag_keys = [key for key in updates if key in FLAGS]
+        if flag_keys:
+            # the bits are set in SQL, from the stored flags rather than from the possibly stale ones of this instance
+            enabled = sum(FLAGS[key] for key in flag_keys if updates[key])
+            disabled = sum(FLAGS[key] for key in flag_keys if not updates[key])
+            updates = {key: value for key, value in updates.items() if key not in FLAGS}
+            if kwargs.pop('cast', True):
+                updates = self.cast_values(updates)
+            updates['website_flags'] = Raw(f"(website_flags | {enabled}) & ~{disabled}")
+            result = self.get_builder().update(updates, *args, cast=False, **kwargs)
+            flags = Guild.where('id', self.id).select('website_flags').first().website_flags
+            self.fill({'website_flags': flags})
+            self.fill_original({'website_flags': flags})
+        else:
+            result = self.get_builder().update(updates, *args, **kwargs)
+        from database.guild_settings import SettingsCache
+        SettingsCache.invalidate(self.id)
+        ReadRouting.written(self.id)
+        CacheSync.publish(self.__table__, self.id)
+        return result
+
+    def mark_updated(self) -> None:
+        """
+        Bump `updated_at` and drop the cached settings, for settings stored in other tables (e.g. custom websites).
+        """
+        self.update({'updated_at': datetime.now()})
+
+    @property
+    def any_website_enabled(self) -> bool:
+        """Whether at least one of the built-in websites is enabled."""
+        return bool(self.website_flags & WEBSITES_MASK)
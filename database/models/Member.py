@@ -5,6 +5,9 @@ from typing import TYPE_CHECKING, Self
 import discore
 
 from database.models.AFilterModel import *
+from database.upsert import insert_ignore
+from database.health import DatabaseUnavailable
+from database.routing import ReadRouting
 
 if TYPE_CHECKING:
     from database.models.Guild import Guild
@@ -27,23 +30,60 @@ class Member(AFilterModel):
             from database.models.Guild import Guild
             guild = Guild.find_or_create(d_member.guild, **(guild_kwargs or {}))
 
-        member = cls.where('user_id', d_member.id).where('guild_id', guild.id).first()
+        member = (cls.on(ReadRouting.connection(guild.id))
+                  .where('user_id', d_member.id).where('guild_id', guild.id).first())
         if member:
             return member
 
-        return cls.create({
+        return insert_ignore(cls, {
             'user_id': d_member.id,
             'guild_id': guild.id,
             'on_deny_list': True if d_member.bot else False,
             'bot': d_member.bot,
             **kwargs
-        }).fresh()
+        }) or cls.where('user_id', d_member.id).where('guild_id', guild.id).first()
 
     @classmethod
     def find_get_enabled(cls, d_member: discore.Member, guild: Guild | None = None) -> bool:
         if not guild:
             return not d_member.bot
-        element = cls.where('user_id', d_member.id).where('guild_id', guild.id).first()
+        element = (cls.on(ReadRouting.connection(guild.id))
+                   .select('on_deny_list', 'on_allow_list')
+                   .where('user_id', d_member.id).where('guild_id', guild.id).first())
+        if element:
+            return element.enabled(guild)
+        if guild[f'{cls.__table__}_use_allow_list']:
+            return False
+        return not d_member.bot
+
+    @classmethod
+    def _fetch_lists(cls, keys: list[tuple[int, int]]) -> dict[tuple[int, int], Self]:
+        """
+        Fetch the list flags of several members at once.
+
+        :param keys: the (user id, guild id) of the members
+        :return: the members found, by (user id, guild id)
+        """
+        guild_ids = list({guild_id for _, guild_id in keys})
+        members = (cls.on(ReadRouting.connection(*guild_ids))
+                   .select('user_id', 'guild_id', 'on_deny_list', 'on_allow_list')
+                   .where_in('user_id', list({user_id for user_id, _ in keys}))
+                   .where_in('guild_id', guild_ids)
+                   .get())
+        wanted = set(keys)
+        return {
+            (member.user_id, member.guild_id): member
+            for member in members if (member.user_id, member.guild_id) in wanted
+        }
+
+    @classmethod
+    async def load_get_enabled(cls, d_member: discore.Member, guild: Guild | None = None) -> bool:
+        if not guild:
+            return not d_member.bot
+        try:
+            element = await cls.loader().load((d_member.id, guild.id))
+        except DatabaseUnavailable:
+            element = None
         if element:
             return element.enabled(guild)
         if guild[f'{cls.__table__}_use_allow_list']:
@@ -65,3 +105,4 @@ class Member(AFilterModel):
         cls.where('guild_id', guild.id).where('bot', True).update({
             'on_deny_list': True
         })
+        ReadRouting.written(guild.id)
@@ -5,6 +5,8 @@ from typing import List, Self, TYPE_CHECKING
 import discore
 
 from database.models.AFilterModel import *
+from database.health import DatabaseUnavailable
+from database.routing import ReadRouting
 
 if TYPE_CHECKING:
     from database.models.Guild import Guild
@@ -42,7 +44,10 @@ class Role(AFilterModel):
             return [True]
 
         roles_id = {role.id for role in d_roles}
-        db_roles: List[Role] = cls.where_in('id', list(roles_id)).get()
+        db_roles: List[Role] = (cls.on(ReadRouting.connection(guild.id))
+                                .where_in('id', list(roles_id))
+                                .where('guild_id', guild.id)
+                                .get())
 
         results = [role.enabled(guild) for role in db_roles]
 
@@ -54,3 +59,25 @@ class Role(AFilterModel):
             results.extend([default_status] * missing_roles_count)
 
         return results
+
+    @classmethod
+    async def loads_get_enabled(cls, d_roles: list[discore.Role], guild: Guild | None = None) -> List[bool]:
+        """
+        Same as `finds_get_enabled`, but the lookups are batched with the concurrent ones and run in a worker thread.
+        If the database is unavailable, the roles are considered not to be on any list.
+        :param d_roles: A list of discore.Role instances
+        :param guild: The guild to which the roles belong
+        :return: A list of boolean values indicating whether roles are enabled
+        """
+        if not guild:
+            return [True]
+
+        default_status = not guild[f'{cls.__table__}_use_allow_list']
+        try:
+            db_roles: List[Role | None] = await cls.loader().load_many({role.id for role in d_roles})
+        except DatabaseUnavailable:
+            return [default_status]
+        return [
+            role.enabled(guild) if role is not None and role.guild_id == guild.id else default_status
+            for role in db_roles
+        ]
@@ -0,0 +1,80 @@
+"""
+Routing of the reads between the main database and its read replica.
+
+When `database_replica` is configured, `database/config.py` registers a `replica` connection next to the main one.
+Writes always go to the main database. Reads that tolerate replication lag ask `ReadRouting.connection` for the
+connection to use: after a guild's settings are written, in this process or in another one, its reads stick to the
+main database for `database_replica.sticky_seconds`, so that neither the admin nor the settings cache sees the
+settings from before the change.
+"""
+
+from __future__ import annotations
+
+import time
+
+import discore
+
+__all__ = ('ReadRouting',)
+
+
+class ReadRouting:
+    """Read-your-writes routing of the reads to the replica."""
+
+    # end of the stickiness window, by guild id
+    _sticky_until: dict[int, float] = {}
+    # end of the stickiness window of every guild, e.g. after the cache of every guild was dropped
+    _all_sticky_until: float = 0.0
+
+    @classmethod
+    def enabled(cls) -> bool:
+        """Whether a read replica is configured"""
+        return bool(discore.config.database_replica)
+
+    @classmethod
+    def sticky_seconds(cls) -> float:
+        """How long the reads of a guild stick to the main database after a write"""
+        return (discore.config.database_replica and discore.config.database_replica.sticky_seconds) or 5
+
+    @classmethod
+    def written(cls, guild_id: int | None) -> None:
+        """
+        Record a write to the settings of a guild, so that its reads stick to the main database for a while.
+
+        :param guild_id: the id of the guild, None if any guild may have been written to
+        """
+
+        if not cls.enabled():
+            return
+        now = time.monotonic()
+        until = now + cls.sticky_seconds()
+        if guild_id is None:
+            cls._all_sticky_until = until
+            cls._sticky_until.clear()
+            return
+        cls._sticky_until[guild_id] = until
+        if len(cls._sticky_until) > 1000:
+            cls._sticky_until = {key: value for key, value in cls._sticky_until.items() if value > now}
+
+    @classmethod
+    def connection(cls, *guild_ids: int, sticky: bool = True) -> str:
+        """
+        Get the connection to read with.
+
+        :param guild_ids: the ids of the guilds the read is about. If none is given, the read may be about any guild
+        :param sticky: whether the read must see the recent writes. If False, the replica is always used
+        :return: the name of the connection
+        """
+
+        if not cls.enabled():
+            return 'default'
+        if not sticky:
+            return 'replica'
+        now = time.monotonic()
+        if now < cls._all_sticky_until:
+            return 'default'
+        if guild_ids:
+            if any(cls._sticky_until.get(guild_id, 0.0) > now for guild_id in guild_ids):
+                return 'default'
+        elif any(until > now for until in list(cls._sticky_until.values())):
+            return 'default'
+        return 'replica'
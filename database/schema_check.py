@@ -0,0 +1,123 @@
+"""
+Migrate the database at startup, unless the migrations didn't change since the last successful run.
+
+`masonite-orm migrate` imports every migration module and queries the migrations table, which takes a few seconds
+on every container start even when there is nothing to migrate. This check hashes the migration directory instead,
+and compares it to the hash recorded in the `schema_version` table by the last successful migrate: when they match,
+the migrate step is skipped entirely. Migrations rolled back by hand aren't detected, use `--force` after doing so.
+
+Usage: python -m database.schema_check [--force]
+"""
+
+import time
+
+_start = time.monotonic()
+
+import argparse
+import datetime as dt
+import hashlib
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+os.environ.setdefault('DB_CONFIG_PATH', 'database/config.py')
+
+from masoniteorm.query import QueryBuilder
+
+_logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path('database/migrations')
+MIGRATE_COMMAND = ('masonite-orm', 'migrate', '-C', 'database/config.py', '-d', str(MIGRATIONS_DIR))
+TABLE = 'schema_version'
+
+
+def migrations_hash(migrations_dir: Path = MIGRATIONS_DIR) -> str:
+    """
+    Hash the names and contents of the migrations.
+
+    :param migrations_dir: the directory of the migrations
+    :return: the hex digest of the hash
+    """
+
+    digest = hashlib.sha256()
+    for path in sorted(migrations_dir.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(b'\0')
+        digest.update(path.read_bytes())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def read_version() -> dict | None:
+    """
+    Read the schema version recorded by the last successful migrate.
+
+    :return: the recorded version, None if there is none, or if the table doesn't exist yet
+    """
+
+    try:
+        return QueryBuilder().table(TABLE).where('id', 1).first()
+    except Exception as e:
+        _logger.info("[DATABASE] No schema version recorded (%s)", e)
+        return None
+
+
+def write_version(digest: str, migrate_ms: int) -> None:
+    """
+    Record the schema version after a successful migrate.
+
+    :param digest: the hash of the migrations
+    :param migrate_ms: the time the migrate step took, in milliseconds
+    """
+
+    now = dt.datetime.now()
+    values = {'migrations_hash': digest, 'migrate_ms': migrate_ms, 'updated_at': now}
+    if QueryBuilder().table(TABLE).where('id', 1).first():
+        QueryBuilder().table(TABLE).where('id', 1).update(values)
+    else:
+        QueryBuilder().table(TABLE).create({'id': 1, 'created_at': now, **values})
+
+
+def check(force: bool = False) -> int:
+    """
+    Run the migrations if they changed since the last successful migrate.
+
+    :param force: whether to run the migrations even if they didn't change
+    :return: the exit code of the migrate step, 0 if it was skipped
+    """
+
+    digest = migrations_hash()
+    version = None if force else read_version()
+    if version and version['migrations_hash'] == digest:
+        check_ms = round((time.monotonic() - _start) * 1000)
+        _logger.info(
+            "[DATABASE] Migrations unchanged (%s), migrate skipped: checked in %d ms (the last migrate, on %s, "
+            "took %d ms)", digest[:12], check_ms, version['updated_at'], version['migrate_ms'])
+        return 0
+
+    _logger.info("[DATABASE] Migrations changed (%s), running migrate", digest[:12])
+    start = time.monotonic()
+    code = subprocess.run(MIGRATE_COMMAND).returncode
+    migrate_ms = round((time.monotonic() - start) * 1000)
+    if code:
+        _logger.error("[DATABASE] Migrate failed with exit code %d after %d ms", code, migrate_ms)
+        return code
+
+    write_version(digest, migrate_ms)
+    _logger.info("[DATABASE] Migrated in %d ms", migrate_ms)
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate the database, unless the migrations didn't change.")
+    parser.add_argument('--force', action='store_true', help="run the migrations even if they didn't change")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[{asctime}] {levelname:<8} {message}", style='{')
+    sys.exit(check(args.force))
+
+
+if __name__ == '__main__':
+    main()
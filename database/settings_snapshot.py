@@ -0,0 +1,181 @@
+"""
+Local binary snapshot of the guild settings cache, for instant warm starts.
+
+Layout (little-endian):
+  - header: magic, format version, schema stamp, number of entries
+  - index: one (guild id, version, offset, length) record per guild, the version being the guild `updated_at`
+  - payload: the pickled GuildSettings, at their offset
+
+The file is memory-mapped and only its index is read when opened: each entry is unpickled on first use. The file is
+written by the bot itself, next to it, and is trusted as such.
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import pickle
+import struct
+import zlib
+from dataclasses import fields
+from pathlib import Path
+from typing import Container, Iterable
+
+from database.guild_settings import GuildSettings
+
+__all__ = ('SettingsSnapshot',)
+
+_logger = logging.getLogger(__name__)
+
+MAGIC = b'FTBS'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHII')
+ENTRY = struct.Struct('<QdQI')
+
+
+def schema_stamp() -> int:
+    """A checksum of the GuildSettings fields, so that a snapshot written by another version is discarded."""
+    return zlib.crc32(' '.join(field.name for field in fields(GuildSettings)).encode())
+
+
+class SettingsSnapshot:
+    """A read-only, memory-mapped settings snapshot."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        """
+        Open a snapshot. A missing, truncated or outdated file gives an empty snapshot.
+
+        :param path: the path of the snapshot file
+        """
+
+        self.path = Path(path)
+        self._file = None
+        self._mmap: mmap.mmap | None = None
+        self._index: dict[int, tuple[float, int, int]] = {}
+
+        if not self.path.exists() or self.path.stat().st_size < HEADER.size:
+            return
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, stamp, count = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC or version != FORMAT_VERSION or stamp != schema_stamp():
+                _logger.info("[CACHE] Ignoring outdated settings snapshot %s", self.path)
+                self.close()
+                return
+            for i in range(count):
+                guild_id, updated_at, offset, length = ENTRY.unpack_from(self._mmap, HEADER.size + i * ENTRY.size)
+                if offset + length > len(self._mmap):
+                    raise ValueError("entry out of bounds")
+                self._index[guild_id] = (updated_at, offset, length)
+        except (struct.error, ValueError) as e:
+            _logger.warning("[CACHE] Ignoring corrupted settings snapshot %s: %r", self.path, e)
+            self._index.clear()
+            self.close()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._index
+
+    def pop(self, guild_id: int) -> GuildSettings | None:
+        """
+        Take the settings of a guild out of the snapshot.
+
+        :param guild_id: the id of the guild
+        :return: the guild settings, None if the guild isn't in the snapshot or its entry can't be read
+        """
+
+        entry = self._index.pop(guild_id, None)
+        if entry is None or self._mmap is None:
+            return None
+        _, offset, length = entry
+        try:
+            return pickle.loads(self._mmap[offset:offset + length])
+        except Exception as e:
+            _logger.warning("[CACHE] Unreadable settings snapshot entry for guild %d: %r", guild_id, e)
+            return None
+
+    def discard(self, guild_id: int) -> None:
+        """
+        Forget the settings of a guild, e.g. because they changed.
+
+        :param guild_id: the id of the guild
+        """
+        self._index.pop(guild_id, None)
+
+    def raw_entries(self, guild_ids: Container[int] | None = None) -> dict[int, tuple[float, bytes]]:
+        """
+        Copy the entries not taken yet out of the file, to write them to a new snapshot.
+        The copies stay valid once the snapshot is closed.
+
+        :param guild_ids: the guilds whose entries to copy. If None, every entry is copied
+        :return: the version and the pickled payload of each entry, by guild id
+        """
+
+        entries = {}
+        for guild_id, (updated_at, offset, length) in self._index.items():
+            if guild_ids is not None and guild_id not in guild_ids:
+                continue
+            payload = self.read_raw(offset, length)
+            if payload is None:
+                break
+            entries[guild_id] = (updated_at, payload)
+        return entries
+
+    def read_raw(self, offset: int, length: int) -> bytes | None:
+        """
+        Read the pickled payload of an entry.
+
+        :param offset: the offset of the entry
+        :param length: the length of the entry
+        :return: the payload, None if the snapshot is closed
+        """
+        if self._mmap is None:
+            return None
+        return self._mmap[offset:offset + length]
+
+    def close(self) -> None:
+        """Release the memory map and the file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def write(
+            path: str | os.PathLike,
+            settings: Iterable[GuildSettings],
+            previous_entries: dict[int, tuple[float, bytes]] | None = None
+    ) -> int:
+        """
+        Atomically write a snapshot. Blocking.
+
+        :param path: the path of the snapshot file
+        :param settings: the settings to write
+        :param previous_entries: the entries of a previous snapshot, as returned by `raw_entries`, copied as is unless
+            in `settings`
+        :return: the number of entries written
+        """
+
+        payloads: dict[int, tuple[float, bytes]] = dict(previous_entries or {})
+        for guild_settings in settings:
+            payloads[guild_settings.id] = (
+                guild_settings.updated_at, pickle.dumps(guild_settings, protocol=pickle.HIGHEST_PROTOCOL))
+
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        offset = HEADER.size + len(payloads) * ENTRY.size
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, schema_stamp(), len(payloads)))
+            for guild_id, (updated_at, payload) in payloads.items():
+                f.write(ENTRY.pack(guild_id, updated_at, offset, len(payload)))
+                offset += len(payload)
+            for _, payload in payloads.values():
+                f.write(payload)
+        os.replace(tmp_path, path)
+        return len(payloads)
@@ -0,0 +1,103 @@
+"""
+Race-free row creation helpers.
+
+`find` then `create` lets two concurrent handlers (e.g. two messages from a guild the bot just joined) both miss and
+both insert, which either fails on the unique key or duplicates the row. Inserting while ignoring duplicates, then
+selecting the row, is safe whichever handler wins.
+
+Only the duplicate key conflicts are ignored: `INSERT IGNORE` (MySQL) and `INSERT OR IGNORE` (SQLite) would also turn
+foreign key, NOT NULL or truncation errors into silently skipped rows. On SQL Server, which has neither, the insert is
+sent as is and its duplicate key errors are ignored; any other error, on any database, is raised. Where the database can return the inserted row
+(`RETURNING`: SQLite 3.35+, MariaDB 10.5+, PostgreSQL), it is returned by the insert itself, so that a miss costs the
+lookup and the insert, rather than the lookup, the insert and a second lookup.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+from masoniteorm.exceptions import QueryException
+from masoniteorm.models import Model
+
+__all__ = ('insert_ignore', )
+
+# MySQL error codes of a duplicate key, and of a syntax error (e.g. `RETURNING` on MySQL, which doesn't support it)
+ER_DUP_ENTRY = 1062
+ER_PARSE_ERROR = 1064
+
+# SQL Server error numbers of a duplicate key, in a unique constraint and in a unique index, as shown in its messages
+MSSQL_DUP_KEYS = ('(2627)', '(2601)')
+
+# the connections whose MySQL server doesn't support `RETURNING`
+_no_returning: set[str] = set()
+
+
+def _mysql_error(e: QueryException) -> int | None:
+    """
+    Get the MySQL error code of a failed query.
+
+    :param e: the exception raised by the query
+    :return: the error code, None if the query didn't fail with a MySQL error
+    """
+    cause = e.__cause__
+    return cause.args[0] if cause is not None and cause.args and isinstance(cause.args[0], int) else None
+
+
+def _mssql_duplicate_key(e: QueryException) -> bool:
+    """
+    Check whether a failed SQL Server query failed on a duplicate key.
+
+    :param e: the exception raised by the query
+    :return: whether the query failed on a duplicate key
+    """
+    cause = e.__cause__
+    message = ' '.join(str(arg) for arg in cause.args) if cause is not None else ''
+    return any(code in message for code in MSSQL_DUP_KEYS)
+
+
+def insert_ignore(model: type[Model], values: dict) -> Model | None:
+    """
+    Insert a row, unless it would duplicate a unique key, in which case nothing is done.
+    The model's casts and timestamps are applied as with `Model.create`.
+
+    :param model: the model to insert the row for
+    :param values: the values of the row
+    :return: the inserted row, None if it already existed, or if the database can't return it
+    :raise QueryException: if the insert failed for another reason than a duplicate key
+    """
+
+    builder = model.create(values, query=True)
+    sql = builder.to_qmark()
+    bindings = builder._bindings
+    driver = builder.connection_class.name
+    connection = builder.new_connection()
+
+    if driver == 'postgres' or (driver == 'sqlite' and sqlite3.sqlite_version_info >= (3, 35)):
+        row = connection.query(sql + ' ON CONFLICT DO NOTHING RETURNING *', bindings, results=1)
+        return model.hydrate(row) if row else None
+    if driver == 'sqlite':
+        connection.query(sql + ' ON CONFLICT DO NOTHING', bindings)
+        return None
+    if driver == 'mysql':
+        if builder.connection not in _no_returning:
+            try:
+                row = connection.query(sql + ' RETURNING *', bindings, results=1)
+            except QueryException as e:
+                error = _mysql_error(e)
+                if error == ER_DUP_ENTRY:
+                    return None
+                if error != ER_PARSE_ERROR:
+                    raise
+                _no_returning.add(builder.connection)
+            else:
+                return model.hydrate(row) if row else None
+        primary_key = model.get_primary_key()
+        connection.query(sql + f' ON DUPLICATE KEY UPDATE `{primary_key}` = `{primary_key}`', bindings)
+        return None
+
+    try:
+        connection.query(sql, bindings)
+    except QueryException as e:
+        if not (driver == 'mssql' and _mssql_duplicate_key(e)):
+            raise
+    return None
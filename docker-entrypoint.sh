@@ -29,6 +29,6 @@ done
 
 echo -e \\n"Database ready"
 
-masonite-orm migrate -C database/config.py -d database/migrations || echo "Migration failed but continuing..."
+python -m database.schema_check || echo "Migration failed but continuing..."
 
 exec "$@"
@@ -0,0 +1,352 @@
+"""
+Fair scheduling of the link fixes across guilds.
+
+Without scheduling, every message competes equally for the event loop and the HTTP rate limits, so a single spammy
+guild delays the fixes of every other one. If `fix_scheduler.rate` is set, each fix first goes through the token
+bucket of its guild, which sheds the links exceeding the guild's rate. It then waits for one of the `fix_scheduler.concurrency` slots, which are handed out
+across the guilds with deficit round-robin: in turn, each guild with waiting fixes is credited a quantum proportional
+to its weight, and runs its fixes while their cost (their number of links) is covered by its credit. A fix only holds
+its slot while its links are rendered and sent, not while it waits for their embeds, so the slots bound the outbound
+requests rather than the fixes in progress.
+
+The weight of a guild is `fix_scheduler.weights[guild id]` if set, `fix_scheduler.premium_weight` for the guilds with
+an active entitlement to the premium SKU, and 1 otherwise.
+
+The number of waiting fixes sets the overload level: as it crosses the `fix_scheduler.overload` thresholds, the fixes
+first skip the typing indicator, then the verification of the embeds, then the fixes of the guilds without a weight
+above 1 (e.g. the non-premium ones) are dropped. Beyond `max_queue` waiting fixes, every new fix is dropped. A level
+is only left once the number of waiting fixes went below half of its threshold.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, AsyncIterator
+
+import discore
+
+from src.utils import TokenBucket, is_sku
+
+__all__ = ('FixScheduler', 'OverloadLevel')
+
+_logger = logging.getLogger(__name__)
+
+
+class OverloadLevel(IntEnum):
+    """How much the fixes are degraded to keep up with the load, each level including the previous ones"""
+
+    NORMAL = 0
+    NO_TYPING = 1
+    NO_EMBED_CHECK = 2
+    DROP_LOW_PRIORITY = 3
+
+
+# config key of the threshold of each level, and its default value
+_LEVEL_THRESHOLDS = {
+    OverloadLevel.NO_TYPING: ('skip_typing', 32),
+    OverloadLevel.NO_EMBED_CHECK: ('skip_embed_check', 64),
+    OverloadLevel.DROP_LOW_PRIORITY: ('drop_low_priority', 128),
+}
+
+
+@dataclass(slots=True)
+class _Waiter:
+    """A fix waiting for a slot."""
+
+    cost: int
+    future: asyncio.Future[None]
+
+
+@dataclass(slots=True)
+class _GuildQueue:
+    """The fixes of a guild waiting for a slot."""
+
+    waiters: deque[_Waiter] = field(default_factory=deque)
+    deficit: float = 0.0
+
+
+class FixScheduler:
+    """Deficit round-robin scheduler of the link fixes, with a rate limit per guild."""
+
+    # maximum number of buckets kept, the full ones being forgotten beyond
+    max_buckets = 10_000
+
+    _queues: dict[int, _GuildQueue] = {}
+    # the guilds with waiting fixes, in round-robin order, the first one having the turn
+    _active: deque[int] = deque()
+    # whether the guild having the turn was credited its quantum
+    _credited: bool = False
+    _running: int = 0
+    _buckets: dict[int, TokenBucket] = {}
+    _premium: set[int] = set()
+    _waiting: int = 0
+    _level: OverloadLevel = OverloadLevel.NORMAL
+    # number of links shed, by reason
+    _shed: dict[str, int] = {'rate': 0, 'overload': 0}
+
+    @classmethod
+    def _config(cls, key: str, default: Any) -> Any:
+        """
+        Read a `fix_scheduler` config value.
+
+        :param key: the config key
+        :param default: the value to use if the key isn't set
+        :return: the value
+        """
+        return (discore.config.fix_scheduler and getattr(discore.config.fix_scheduler, key, None)) or default
+
+    @classmethod
+    def weight(cls, guild_id: int) -> float:
+        """
+        Get the share of the fix capacity of a guild, relative to the other guilds.
+
+        :param guild_id: the id of the guild
+        :return: the weight of the guild
+        """
+
+        weights = cls._config('weights', {})
+        if guild_id in weights or str(guild_id) in weights:
+            return float(weights.get(guild_id, weights.get(str(guild_id))))
+        if guild_id in cls._premium:
+            return float(cls._config('premium_weight', 2))
+        return 1.0
+
+    @classmethod
+    def _overload_config(cls, key: str, default: int) -> int:
+        """
+        Read a `fix_scheduler.overload` config value.
+
+        :param key: the config key
+        :param default: the value to use if the key isn't set
+        :return: the value
+        """
+        overload = cls._config('overload', None)
+        return (overload and getattr(overload, key, None)) or default
+
+    @classmethod
+    def level(cls) -> OverloadLevel:
+        """The current overload level"""
+        return cls._level
+
+    @classmethod
+    def _update_level(cls) -> None:
+        """Update the overload level from the number of waiting fixes, logging the changes"""
+
+        level = OverloadLevel.NORMAL
+        for candidate, (key, default) in _LEVEL_THRESHOLDS.items():
+            threshold = cls._overload_config(key, default)
+            if cls._waiting >= threshold or (candidate <= cls._level and cls._waiting >= threshold / 2):
+                level = candidate
+        if level == cls._level:
+            return
+        log = _logger.warning if level > cls._level else _logger.info
+        log("[SCHEDULER] Overload level %d (%s), %d fixes waiting", level, level.name, cls._waiting)
+        cls._level = level
+
+    @classmethod
+    def overloaded(cls, guild_id: int, cost: int) -> bool:
+        """
+        Check whether a fix must be dropped because of the load.
+
+        :param guild_id: the id of the guild of the fix
+        :param cost: the number of links of the fix, counted as shed if it's dropped
+        :return: True if the fix must be dropped
+        """
+
+        if cls._waiting >= cls._overload_config('max_queue', 256):
+            dropped = True
+        elif cls._level >= OverloadLevel.DROP_LOW_PRIORITY:
+            dropped = cls.weight(guild_id) <= 1
+        else:
+            dropped = False
+        if dropped:
+            cls._shed['overload'] += cost
+        return dropped
+
+    @classmethod
+    def admit(cls, guild_id: int, cost: int) -> int:
+        """
+        Take the links of a message out of the rate limit of its guild.
+        Every link is admitted if no rate is configured.
+
+        :param guild_id: the id of the guild
+        :param cost: the number of links to fix
+        :return: the number of links that can be fixed, the others being shed
+        """
+
+        rate = cls._config('rate', 0)
+        if not rate:
+            return cost
+        bucket = cls._buckets.get(guild_id)
+        if bucket is None:
+            weight = cls.weight(guild_id)
+            bucket = cls._buckets[guild_id] = TokenBucket(
+                cls._config('burst', 30) * weight, rate * weight)
+            if len(cls._buckets) > cls.max_buckets:
+                cls._buckets = {
+                    key: value for key, value in cls._buckets.items() if value.available() < value.capacity}
+
+        admitted = min(cost, max(math.floor(bucket.available()), 0))
+        bucket.take(admitted)
+        cls._shed['rate'] += cost - admitted
+        return admitted
+
+    @classmethod
+    @contextlib.asynccontextmanager
+    async def slot(cls, guild_id: int, cost: int) -> AsyncIterator[None]:
+        """
+        Wait for the turn of a fix, and hold one of the slots until the block exits.
+
+        :param guild_id: the id of the guild of the fix
+        :param cost: the number of links of the fix
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        queue = cls._queues.get(guild_id)
+        if queue is None:
+            queue = cls._queues[guild_id] = _GuildQueue()
+            cls._active.append(guild_id)
+        queue.waiters.append(_Waiter(cost, future))
+        cls._waiting += 1
+        cls._pump()
+        cls._update_level()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # the slot may have been handed out in the meantime
+            if future.done() and not future.cancelled():
+                cls._release()
+            raise
+        try:
+            yield
+        finally:
+            cls._release()
+
+    @classmethod
+    def _release(cls) -> None:
+        """Free a slot, and hand it out to the next fix"""
+        cls._running -= 1
+        cls._pump()
+        cls._update_level()
+
+    @classmethod
+    def _pump(cls) -> None:
+        """Hand out the free slots to the next fixes"""
+
+        concurrency = cls._config('concurrency', 48)
+        while cls._running < concurrency and (waiter := cls._next()) is not None:
+            cls._running += 1
+            waiter.future.set_result(None)
+
+    @classmethod
+    def _next(cls) -> _Waiter | None:
+        """
+        Pick the next fix to run, with deficit round-robin.
+
+        :return: the fix, None if no fix is waiting
+        """
+
+        quantum = cls._config('quantum', 4)
+        while cls._active:
+            guild_id = cls._active[0]
+            queue = cls._queues[guild_id]
+            while queue.waiters and queue.waiters[0].future.done():
+                queue.waiters.popleft()
+                cls._waiting -= 1
+
+            if queue.waiters:
+                if not cls._credited:
+                    queue.deficit += quantum * cls.weight(guild_id)
+                    cls._credited = True
+                if queue.waiters[0].cost <= queue.deficit:
+                    waiter = queue.waiters.popleft()
+                    cls._waiting -= 1
+                    queue.deficit -= waiter.cost
+                    if not queue.waiters:
+                        cls._remove(guild_id)
+                    return waiter
+                cls._active.rotate(-1)
+            else:
+                cls._remove(guild_id)
+            cls._credited = False
+        return None
+
+    @classmethod
+    def _remove(cls, guild_id: int) -> None:
+        """
+        Remove a guild without waiting fixes from the round-robin, resetting its credit.
+
+        :param guild_id: the id of the guild, which has the turn
+        """
+
+        cls._active.popleft()
+        del cls._queues[guild_id]
+        cls._credited = False
+
+    @classmethod
+    def set_premium(cls, guild_id: int, premium: bool) -> None:
+        """
+        Record whether a guild has an active entitlement to the premium SKU.
+
+        :param guild_id: the id of the guild
+        :param premium: whether the guild is premium
+        """
+
+        if premium:
+            cls._premium.add(guild_id)
+        else:
+            cls._premium.discard(guild_id)
+        cls._buckets.pop(guild_id, None)
+
+    @classmethod
+    def on_entitlement(cls, entitlement: discore.Entitlement, deleted: bool = False) -> None:
+        """
+        Update the premium guilds from an entitlement.
+
+        :param entitlement: the entitlement created, updated or deleted
+        :param deleted: whether the entitlement was deleted
+        """
+
+        if entitlement.guild_id is None or not is_sku() or entitlement.sku_id != discore.config.sku:
+            return
+        cls.set_premium(entitlement.guild_id, not deleted and not entitlement.is_expired())
+
+    @classmethod
+    async def load_premium(cls, bot: discore.Bot) -> None:
+        """
+        Load the guilds having an active entitlement to the premium SKU.
+
+        :param bot: the bot
+        """
+
+        if not is_sku() or discore.config.sku is True:
+            return
+        async for entitlement in bot.entitlements(
+                limit=None, skus=[discore.Object(discore.config.sku)], exclude_ended=True):
+            cls.on_entitlement(entitlement)
+        _logger.info("[SCHEDULER] Loaded %d premium guilds", len(cls._premium))
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """
+        Get the state of the scheduler.
+
+        :return: the number of running fixes, of waiting fixes, of guilds with waiting fixes, the overload level,
+            and the number of links shed because of the rate limits of the guilds and because of the load
+        """
+
+        return {
+            'running': cls._running,
+            'waiting': cls._waiting,
+            'guilds': len(cls._active),
+            'level': cls._level,
+            'shed_rate': cls._shed['rate'],
+            'shed_overload': cls._shed['overload'],
+        }
@@ -0,0 +1,175 @@
+"""
+Outbound queue of the fixed links, per channel.
+
+The messages sent to a channel go through its queue, emptied by a worker task that only runs while the queue isn't
+empty. When a burst of messages piles up in a channel, the consecutive plain messages are merged into a single one,
+as long as it fits in 2000 characters. A merged send failing is retried message by message, unless it failed with a
+429: discord.py already waits out and retries the rate limits, so one reaching the queue means they persist.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import discore
+
+__all__ = ('SendQueue',)
+
+
+@dataclass(slots=True)
+class _Job:
+    """A message waiting to be sent."""
+
+    content: str
+    silent: bool
+    # how to send the message, None for a plain message, which can be merged with its neighbours
+    send: Callable[[], Awaitable[discore.Message]] | None
+    future: asyncio.Future[discore.Message]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class SendQueue:
+    """Per-channel queues of the outbound messages."""
+
+    # maximum length of a message
+    max_length = 2000
+
+    _queues: dict[int, deque[_Job]] = {}
+    _workers: dict[int, asyncio.Task] = {}
+
+    # statistics since the start of the bot
+    _sent: int = 0
+    _merged: int = 0
+    _waited: int = 0
+    _wait_total: float = 0.0
+    _wait_max: float = 0.0
+
+    @classmethod
+    async def send(
+            cls,
+            channel: discore.abc.Messageable,
+            content: str,
+            silent: bool,
+            send: Callable[[], Awaitable[discore.Message]] | None = None
+    ) -> discore.Message:
+        """
+        Send a message through the queue of its channel.
+
+        :param channel: the channel to send the message to
+        :param content: the content of the message
+        :param silent: whether to send the message silently
+        :param send: how to send the message, e.g. as a reply. If None, the message is sent to the channel,
+            possibly merged with the plain messages queued right after it
+        :return: the message sent, which may contain other messages' content
+        :raise discore.HTTPException: if the message couldn't be sent
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        cls._queues.setdefault(channel.id, deque()).append(_Job(content, silent, send, future))
+        if channel.id not in cls._workers:
+            cls._workers[channel.id] = asyncio.create_task(cls._work(channel))
+        return await future
+
+    @classmethod
+    async def _work(cls, channel: discore.abc.Messageable) -> None:
+        """
+        Send the messages queued for a channel, until its queue is empty.
+
+        :param channel: the channel to send the messages to
+        """
+
+        queue = cls._queues[channel.id]
+        try:
+            while queue:
+                job = queue.popleft()
+                if job.future.done():
+                    continue
+                batch = [job]
+                length = len(job.content)
+                while (job.send is None and queue and queue[0].send is None and queue[0].silent == job.silent
+                       and length + 1 + len(queue[0].content) <= cls.max_length):
+                    batch.append(queue.popleft())
+                    length += 1 + len(batch[-1].content)
+
+                now = time.monotonic()
+                cls._waited += len(batch)
+                for queued in batch:
+                    wait = now - queued.enqueued_at
+                    cls._wait_total += wait
+                    cls._wait_max = max(cls._wait_max, wait)
+                await cls._deliver(channel, batch)
+        finally:
+            del cls._workers[channel.id]
+            if queue:
+                # the worker was cancelled, nothing will send the remaining messages
+                for job in queue:
+                    job.future.cancel()
+            del cls._queues[channel.id]
+
+    @classmethod
+    async def _deliver(cls, channel: discore.abc.Messageable, batch: list[_Job]) -> None:
+        """
+        Send a batch of messages as a single one, resolving their futures.
+
+        :param channel: the channel to send the messages to
+        :param batch: the messages, only the first one having a `send` function
+        """
+
+        content = '\n'.join(job.content for job in batch)
+        send = batch[0].send or (lambda: channel.send(content, silent=batch[0].silent))
+        try:
+            message = await send()
+        except discore.HTTPException as e:
+            if len(batch) > 1 and e.status != 429:
+                for job in batch:
+                    await cls._deliver(channel, [job])
+                return
+            cls._resolve(batch, exception=e)
+            return
+        except Exception as e:
+            cls._resolve(batch, exception=e)
+            return
+        cls._sent += 1
+        cls._merged += len(batch) - 1
+        cls._resolve(batch, message)
+
+    @staticmethod
+    def _resolve(batch: list[_Job], message: discore.Message | None = None, exception: BaseException | None = None) -> None:
+        """
+        Resolve the futures of a batch of messages.
+
+        :param batch: the messages
+        :param message: the message sent, if any
+        :param exception: the exception raised while sending, if any
+        """
+
+        for job in batch:
+            if job.future.done():
+                continue
+            if exception is not None:
+                job.future.set_exception(exception)
+            else:
+                job.future.set_result(message)
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """
+        Get the state of the queues, and statistics on the messages sent since the start of the bot.
+
+        :return: the number of active channels, the number of queued messages, the depth of the longest queue,
+            the number of sends and merged messages, and the average and maximum wait, in ms
+        """
+
+        return {
+            'channels': len(cls._queues),
+            'depth': sum(len(queue) for queue in cls._queues.values()),
+            'max_depth': max((len(queue) for queue in cls._queues.values()), default=0),
+            'sent': cls._sent,
+            'merged': cls._merged,
+            'avg_wait_ms': cls._wait_total / cls._waited * 1000 if cls._waited else 0.0,
+            'max_wait_ms': cls._wait_max * 1000,
+        }
@@ -13,6 +13,7 @@ from database.models.TextChannel import *
 from database.models.Guild import *
 from database.models.Member import *
 from database.models.CustomWebsite import CustomWebsite
+from database.health import DBHealth
 
 from src.utils import *
 
@@ -1565,6 +1566,7 @@ class CustomWebsiteModal(discore.ui.Modal):
                 domain=domain_field,
                 fix_domain=fix_domain_field
             )
+        self.setting.ctx.guild.mark_updated()
         self.setting.custom_websites._items.append(self.website)
         self.setting.selected = self.website
         await self.setting.view.refresh(interaction)
@@ -1672,6 +1674,7 @@ class CustomWebsitesSetting(BaseSetting):
 
     async def delete_action(self, view: SettingsView, interaction: discore.Interaction, _) -> None:
         self.selected.delete()
+        self.ctx.guild.mark_updated()
         self.custom_websites._items.remove(self.selected)
         self.selected = None
         await view.refresh(interaction)
@@ -1838,6 +1841,18 @@ class SettingsView(discore.ui.View):
         except (discore.HTTPException, asyncio.CancelledError):
             pass
 
+    async def interaction_check(self, interaction: discore.Interaction) -> bool:
+        """
+        Reject the interactions while the database is in degraded mode, as the settings can't be saved
+        :param interaction: The interaction to check
+        :return: True if the interaction can be processed, False otherwise
+        """
+        if DBHealth.degraded():
+            # noinspection PyUnresolvedReferences
+            await interaction.response.send_message(t('settings.degraded'), ephemeral=True)
+            return False
+        return True
+
     async def select_parameter(self, interaction: discore.Interaction, select: discore.ui.Select) -> None:
         """
         The callback for the select parameter item. Allows to select a setting among the available ones.
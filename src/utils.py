@@ -2,8 +2,9 @@ import asyncio
 import contextvars
 import inspect
 import logging
+import time
 import traceback as tb
-from typing import TypeVar, Any, Iterable, Protocol, Generic, Awaitable
+from typing import TypeVar, Any, Iterable, Protocol, Generic, Awaitable, Literal
 
 import aiohttp
 import discore
@@ -19,7 +20,7 @@ __all__ = (
     't', 'translate', 'object_format', 'edit_callback', 'is_premium',
     'is_sku', 'format_perms', 'is_missing_perm', 'I18nTranslator', 'tstr',
     'group_join', 'group_items', 'l', 'GuildChild', 'HybridElement', 'reply_to_member',
-    'session', 'safe_send_coro', 'entrypoint_context', 'Typing'
+    'session', 'safe_send_coro', 'entrypoint_context', 'Typing', 'DelayedTyping', 'TokenBucket'
 )
 
 from database.models.Guild import Guild
@@ -213,25 +214,81 @@ def tstr(key: str, **kwargs) -> locale_str:
     return locale_str(t(key, locale=i18n.config.get('fallback'), **kwargs), key=key, **kwargs)
 
 
-def group_items(items: Iterable[T], max_group_size: int, sep: str = "\n") -> list[tuple[str, list[T]]]:
+def _pack_next_fit(sizes: list[int], capacity: int) -> list[list[int]]:
+    """
+    Pack items into bins one after the other, starting a new bin when the next item doesn't fit in the current one.
+
+    :param sizes: the size of each item
+    :param capacity: the capacity of a bin
+    :return: the indexes of the items of each bin, in order
+    """
+    bins: list[list[int]] = []
+    used = capacity
+    for i, size in enumerate(sizes):
+        if bins and used + size <= capacity:
+            bins[-1].append(i)
+            used += size
+        else:
+            bins.append([i])
+            used = size
+    return bins
+
+
+def _pack_first_fit_decreasing(sizes: list[int], capacity: int) -> list[list[int]]:
+    """
+    Pack items into bins from the largest to the smallest, each one into the first bin it fits in.
+
+    :param sizes: the size of each item
+    :param capacity: the capacity of a bin
+    :return: the indexes of the items of each bin, the bins and their items being in the order of the items
+    """
+    bins: list[list[int]] = []
+    used: list[int] = []
+    for i in sorted(range(len(sizes)), key=sizes.__getitem__, reverse=True):
+        index = next((b for b in range(len(bins)) if used[b] + sizes[i] <= capacity), None)
+        if index is None:
+            bins.append([i])
+            used.append(sizes[i])
+        else:
+            bins[index].append(i)
+            used[index] += sizes[i]
+    for items in bins:
+        items.sort()
+    bins.sort()
+    return bins
+
+
+def group_items(
+        items: Iterable[T],
+        max_group_size: int,
+        sep: str = "\n",
+        packing: Literal['next_fit', 'first_fit_decreasing'] = 'next_fit'
+) -> list[tuple[str, list[T]]]:
     """
     Group items based on their string representation while maintaining reference to original items.
+    An item longer than the maximum size gets a group of its own.
 
     :param items: The items to group.
     :param max_group_size: The maximum allowed size (in characters) for each group.
     :param sep: The separator to use between items in a group.
+    :param packing: How to fill the groups:
+        'next_fit' fills them one after the other, keeping the items in order, which makes the fewest groups possible
+        for groups of consecutive items;
+        'first_fit_decreasing' puts the longest items first, each in the first group it fits in, then puts the items
+        back in order within and across the groups. It's only used if it makes fewer groups than 'next_fit'.
     :return: A list of tuples (grouped_string, list_of_original_items).
     """
-    groups: list[tuple[str, list[T]]] = []
-    for item in items:
-        item_str = str(item)
-        if not groups:
-            groups.append((item_str, [item]))
-        elif len(groups[-1][0]) + len(sep) + len(item_str) <= max_group_size:
-            groups[-1] = (groups[-1][0] + sep + item_str, groups[-1][1] + [item])
-        else:
-            groups.append((item_str, [item]))
-    return groups
+    strings = [(str(item), item) for item in items]
+    # each item takes its length plus a separator, the groups having room for an extra separator
+    sizes = [len(string) + len(sep) for string, _ in strings]
+    capacity = max_group_size + len(sep)
+
+    groups = _pack_next_fit(sizes, capacity)
+    if packing == 'first_fit_decreasing' and len(groups) > 1:
+        packed = _pack_first_fit_decreasing(sizes, capacity)
+        if len(packed) < len(groups):
+            groups = packed
+    return [(sep.join(strings[i][0] for i in group), [strings[i][1] for i in group]) for group in groups]
 
 
 def group_join(strings: Iterable[str], max_group_size: int, sep: str = "\n") -> list[str]:
@@ -436,4 +493,72 @@ class Typing(_Typing):
 
         while True:
             await asyncio.sleep(5)
-            await safe_send_coro(typing(channel.id))
\ No newline at end of file
+            await safe_send_coro(typing(channel.id))
+
+
+class DelayedTyping(Typing):
+    """
+    Typing indicator that only starts if the block hasn't finished within a grace period,
+    sparing the typing request when the block is quick.
+    """
+
+    def __init__(self, messageable: discore.abc.Messageable, grace: float = 0.3) -> None:
+        """
+        :param messageable: the channel to type in
+        :param grace: the time, in seconds, to wait before starting to type
+        """
+
+        super().__init__(messageable)
+        self.grace = grace
+
+    async def __aenter__(self) -> None:
+        self.task: asyncio.Task[None] = self.loop.create_task(self.do_typing())
+        # noinspection PyTypeChecker
+        self.task.add_done_callback(_typing_done_callback)
+
+    async def do_typing(self) -> None:
+        await asyncio.sleep(self.grace)
+        await self.wrapped_typer()
+        await super().do_typing()
+
+
+class TokenBucket:
+    """Token bucket rate limiter, refilled continuously."""
+
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated_at')
+
+    def __init__(self, capacity: float, rate: float) -> None:
+        """
+        :param capacity: the number of tokens that can be spent in a burst
+        :param rate: the number of tokens regained per second
+        """
+
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def available(self, now: float | None = None) -> float:
+        """
+        Get the number of tokens that can be spent right now.
+
+        :param now: the current monotonic time, if already known
+        :return: the number of tokens left, negative if the bucket is in debt
+        """
+
+        if now is None:
+            now = time.monotonic()
+        return min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+
+    def take(self, tokens: float = 1, now: float | None = None) -> None:
+        """
+        Spend tokens, possibly going into debt if there aren't enough.
+
+        :param tokens: the number of tokens to spend
+        :param now: the current monotonic time, if already known
+        """
+
+        if now is None:
+            now = time.monotonic()
+        self.tokens = self.available(now) - tokens
+        self.updated_at = now
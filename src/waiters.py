@@ -0,0 +1,107 @@
+"""
+Waiting for messages to get their embeds.
+
+Discord sends a message, then fetches its embeds and adds them with a message edit. Instead of a `bot.wait_for`
+check closure per message, evaluated on every edit of the whole bot, the waiters are futures indexed by message id, and
+resolved by the raw edit events, which don't need the message to be in the client cache. Their timeouts are shared by
+a timer wheel, ticked by a single task while there are waiters.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from typing import Awaitable, Callable
+
+__all__ = ('EmbedWaiters',)
+
+
+class EmbedWaiters:
+    """Registry of the futures waiting for a message to get embeds."""
+
+    # duration of a slot of the timer wheel, in seconds
+    tick = 0.25
+    # number of slots of the timer wheel, i.e. the longest timeout is `tick * slots` seconds
+    slots = 64
+
+    _waiters: dict[int, list[asyncio.Future[bool]]] = {}
+    _wheel: list[list[tuple[int, asyncio.Future[bool]]]] = [[] for _ in range(slots)]
+    _position: int = 0
+    _pending: int = 0
+    _ticker: asyncio.Task | None = None
+    _tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def wait(cls, message_id: int, timeout: float) -> asyncio.Future[bool]:
+        """
+        Wait for a message to get embeds.
+
+        :param message_id: the id of the message
+        :param timeout: the time to wait, in seconds, rounded up to the next tick of the wheel
+        :return: a future resolving to True when the message gets embeds, or to False once the timeout expires
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        cls._waiters.setdefault(message_id, []).append(future)
+
+        ticks = min(max(math.ceil(timeout / cls.tick), 1), cls.slots - 1)
+        cls._wheel[(cls._position + ticks) % cls.slots].append((message_id, future))
+        cls._pending += 1
+        if cls._ticker is None or cls._ticker.done():
+            cls._ticker = asyncio.create_task(cls._run())
+        return future
+
+    @classmethod
+    def watch(cls, message_id: int, timeout: float, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Run a callback in the background if a message gets embeds, without waiting for it.
+
+        :param message_id: the id of the message
+        :param timeout: the time to watch the message for, in seconds
+        :param callback: the coroutine function to run when the message gets embeds
+        """
+
+        def done(future: asyncio.Future[bool]) -> None:
+            if future.cancelled() or not future.result():
+                return
+            task = asyncio.create_task(callback())
+            cls._tasks.add(task)
+            task.add_done_callback(cls._tasks.discard)
+
+        cls.wait(message_id, timeout).add_done_callback(done)
+
+    @classmethod
+    def feed(cls, message_id: int, data: dict) -> None:
+        """
+        Resolve the waiters of a message from a raw message edit event.
+
+        :param message_id: the id of the edited message
+        :param data: the raw data of the edit
+        """
+
+        # the embeds of a message with the SUPPRESS_EMBEDS flag aren't displayed
+        if message_id not in cls._waiters or not data.get('embeds') or data.get('flags', 0) & 4:
+            return
+        for future in cls._waiters.pop(message_id):
+            if not future.done():
+                future.set_result(True)
+
+    @classmethod
+    async def _run(cls) -> None:
+        """Tick the timer wheel until there are no waiters left, expiring the waiters of each slot"""
+
+        while cls._pending:
+            await asyncio.sleep(cls.tick)
+            cls._position = (cls._position + 1) % cls.slots
+            expired, cls._wheel[cls._position] = cls._wheel[cls._position], []
+            cls._pending -= len(expired)
+            for message_id, future in expired:
+                if not future.done():
+                    future.set_result(False)
+                # the future may have been cancelled, or resolved by an edit, the waiters of the message then being
+                # a new list
+                waiters = cls._waiters.get(message_id)
+                if waiters is not None and future in waiters:
+                    waiters.remove(future)
+                    if not waiters:
+                        del cls._waiters[message_id]
@@ -0,0 +1,272 @@
+"""
+Pools of the webhooks used to send the fixed links as the original author.
+
+Listing the webhooks of a channel is a REST call, which would double the cost of every message sent in
+`reply_as_original_author_replica` mode. The webhooks of each channel are instead fetched (or created) on first use,
+and kept until the webhooks of the channel are updated, or until sending with one fails because it was deleted.
+The concurrent first uses of a channel share the same fetch, so that they don't each create a webhook.
+
+Discord rate limits each webhook, so a single webhook can't keep up with a busy channel. Each webhook of a pool has a
+token bucket mirroring its rate limit, and the sends go through the webhook with the most tokens left. When none has
+any, another webhook is created, up to `webhook_pool.size` and to Discord's limit of webhooks per channel. Once the
+channel cooled down for `webhook_pool.cool_down_seconds`, the extra webhooks are deleted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import discore
+
+from database.models.TextChannel import GuildMessageableChannel
+from src.utils import safe_send_coro, TokenBucket
+
+__all__ = ('WebhookCache',)
+
+# maximum number of webhooks in a channel, set by Discord
+MAX_CHANNEL_WEBHOOKS = 15
+# rate limit of a webhook, as a number of requests per burst and per second
+WEBHOOK_BURST = 5
+WEBHOOK_RATE = 2.5
+
+
+def _bucket() -> TokenBucket:
+    """Get a token bucket mirroring the rate limit of a new webhook"""
+    return TokenBucket(WEBHOOK_BURST, WEBHOOK_RATE)
+
+
+@dataclass(slots=True)
+class _Pool:
+    """The bot's webhooks of a channel."""
+
+    # the webhooks and their buckets, the first one being kept when the pool shrinks
+    webhooks: list[tuple[discore.Webhook, TokenBucket]]
+    # number of webhooks of the channel that don't belong to the bot
+    others: int
+    # time until which the channel is considered busy, and the pool isn't shrunk
+    busy_until: float = 0.0
+    # whether a webhook is being created for the pool
+    growing: bool = False
+
+
+class WebhookCache:
+    """LRU cache of the pools of webhooks of the channels."""
+
+    # maximum number of cached pools
+    size = 10_000
+
+    _pools: OrderedDict[int, _Pool] = OrderedDict()
+    # number of webhook updates caused by the pools themselves and yet to be received, by channel id
+    _own_updates: dict[int, int] = {}
+    # pools being loaded, by channel id
+    _loading: dict[int, asyncio.Task[_Pool | None]] = {}
+    _tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def pool_size(cls) -> int:
+        """Maximum number of webhooks in the pool of a channel"""
+        return (discore.config.webhook_pool and discore.config.webhook_pool.size) or 3
+
+    @classmethod
+    def cool_down(cls) -> float:
+        """How long a channel must stay calm, in seconds, before its pool shrinks back to one webhook"""
+        return (discore.config.webhook_pool and discore.config.webhook_pool.cool_down_seconds) or 300
+
+    @classmethod
+    async def get(cls, channel: GuildMessageableChannel) -> discore.Webhook | None:
+        """
+        Get, or create, a webhook to send a message as the original author, and count the message in its budget.
+
+        :param channel: the channel to send the fixed links to
+        :return: the webhook to use, if available
+        """
+
+        webhook_channel = channel.parent if isinstance(channel, discore.Thread) else channel
+        if webhook_channel is None:
+            return None
+
+        if not hasattr(webhook_channel, 'webhooks') or not hasattr(webhook_channel, 'create_webhook'):
+            return None
+
+        if not webhook_channel.permissions_for(channel.guild.me).manage_webhooks:
+            return None
+
+        pool = cls._pools.get(webhook_channel.id)
+        if pool is not None:
+            cls._pools.move_to_end(webhook_channel.id)
+        else:
+            pool = await cls._load(webhook_channel)
+            if pool is None:
+                return None
+
+        now = time.monotonic()
+        if len(pool.webhooks) > 1 and now > pool.busy_until:
+            cls._shrink(webhook_channel.id, pool)
+
+        webhook, bucket = max(pool.webhooks, key=lambda item: item[1].available(now))
+        if bucket.available(now) < 1:
+            pool.busy_until = now + cls.cool_down()
+            limit = min(cls.pool_size(), MAX_CHANNEL_WEBHOOKS - pool.others)
+            if len(pool.webhooks) < limit and not pool.growing:
+                pool.growing = True
+                try:
+                    new_webhook = await cls._create(webhook_channel)
+                finally:
+                    pool.growing = False
+                if new_webhook is not None:
+                    webhook, bucket = new_webhook, _bucket()
+                    pool.webhooks.append((webhook, bucket))
+
+        bucket.take(now=time.monotonic())
+        return webhook
+
+    @classmethod
+    async def _load(cls, webhook_channel: discore.abc.GuildChannel) -> _Pool | None:
+        """
+        Load the pool of a channel, or wait for the load already in progress.
+
+        :param webhook_channel: the channel the webhooks belong to
+        :return: the pool, None if the webhooks can't be listed or created
+        """
+
+        channel_id = webhook_channel.id
+        task = cls._loading.get(channel_id)
+        if task is None:
+            task = cls._loading[channel_id] = asyncio.create_task(cls._build(webhook_channel))
+            task.add_done_callback(lambda _: cls._loading.pop(channel_id, None))
+        # shielded, so that a cancelled caller doesn't cancel the load of the others
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def _build(cls, webhook_channel: discore.abc.GuildChannel) -> _Pool | None:
+        """
+        Build the pool of a channel from its webhooks, creating one if the bot has none.
+
+        :param webhook_channel: the channel the webhooks belong to
+        :return: the pool, None if the webhooks can't be listed or created
+        """
+
+        success, webhooks = await safe_send_coro(webhook_channel.webhooks(), forbidden=True)
+        if not success:
+            return None
+        bot = discore.Bot.get()
+        own = [w for w in webhooks if getattr(w.user, 'id', None) == bot.user.id]
+        pool = _Pool([(w, _bucket()) for w in own[:cls.pool_size()]], len(webhooks) - len(own))
+        if not pool.webhooks:
+            webhook = await cls._create(webhook_channel)
+            if webhook is None:
+                return None
+            pool.webhooks.append((webhook, _bucket()))
+        elif len(own) > 1:
+            # webhooks left by a previous run are reused, until the channel cools down
+            pool.busy_until = time.monotonic() + cls.cool_down()
+
+        cls._pools[webhook_channel.id] = pool
+        while len(cls._pools) > cls.size:
+            cls._pools.popitem(last=False)
+        return pool
+
+    @classmethod
+    async def _create(cls, webhook_channel: discore.abc.GuildChannel) -> discore.Webhook | None:
+        """
+        Create a webhook of the bot in a channel.
+
+        :param webhook_channel: the channel to create the webhook in
+        :return: the webhook, None if it can't be created
+        """
+
+        bot = discore.Bot.get()
+        # the update is expected from before the request, as it may be received before the response
+        cls._own_updates[webhook_channel.id] = cls._own_updates.get(webhook_channel.id, 0) + 1
+        success = False
+        try:
+            success, webhook = await safe_send_coro(
+                webhook_channel.create_webhook(name=bot.user.display_name), forbidden=True)
+        finally:
+            if not success:
+                cls._take_own_update(webhook_channel.id)
+        return webhook
+
+    @classmethod
+    def _shrink(cls, channel_id: int, pool: _Pool) -> None:
+        """
+        Delete the extra webhooks of the pool of a calm channel, in the background.
+
+        :param channel_id: the id of the channel the webhooks belong to
+        :param pool: the pool to shrink
+        """
+
+        extra = [webhook for webhook, _ in pool.webhooks[1:]]
+        del pool.webhooks[1:]
+        for webhook in extra:
+            task = asyncio.create_task(cls._delete(channel_id, webhook))
+            cls._tasks.add(task)
+            task.add_done_callback(cls._tasks.discard)
+
+    @classmethod
+    async def _delete(cls, channel_id: int, webhook: discore.Webhook) -> None:
+        """
+        Delete a webhook of a pool.
+        Like for a creation, the update is expected from before the request.
+
+        :param channel_id: the id of the channel the webhook belongs to
+        :param webhook: the webhook to delete
+        """
+
+        cls._own_updates[channel_id] = cls._own_updates.get(channel_id, 0) + 1
+        deleted = False
+        try:
+            deleted, _ = await safe_send_coro(webhook.delete(), not_found=True, forbidden=True)
+        finally:
+            if not deleted:
+                # no update will come, which would hide the next update made by someone else
+                cls._take_own_update(channel_id)
+
+    @classmethod
+    def _take_own_update(cls, channel_id: int) -> bool:
+        """
+        Count an expected update of the webhooks of a channel as received.
+
+        :param channel_id: the id of the channel
+        :return: whether an update was expected
+        """
+
+        own = cls._own_updates.get(channel_id)
+        if not own:
+            return False
+        if own > 1:
+            cls._own_updates[channel_id] = own - 1
+        else:
+            del cls._own_updates[channel_id]
+        return True
+
+    @classmethod
+    def updated(cls, channel_id: int) -> None:
+        """
+        Handle an update of the webhooks of a channel, forgetting its pool unless the update was caused by the pool.
+
+        :param channel_id: the id of the channel whose webhooks were updated
+        """
+
+        if not cls._take_own_update(channel_id):
+            cls._pools.pop(channel_id, None)
+
+    @classmethod
+    def invalidate(cls, channel_id: int, webhook: discore.Webhook | None = None) -> None:
+        """
+        Forget a webhook of a channel.
+
+        :param channel_id: the id of the channel the webhook belongs to (the parent channel, for threads)
+        :param webhook: the webhook to forget. If None, forget the whole pool of the channel
+        """
+
+        pool = cls._pools.get(channel_id)
+        if pool is None:
+            return
+        if webhook is not None:
+            pool.webhooks = [item for item in pool.webhooks if item[0].id != webhook.id]
+        if webhook is None or not pool.webhooks:
+            del cls._pools[channel_id]
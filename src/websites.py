@@ -7,6 +7,7 @@ from typing import Type, Iterable, Callable
 
 from database.models.Event import *
 from database.models.Guild import *
+from database.guild_settings import GuildSettings
 from src import utils
 
 __all__ = ('WebsiteLink', 'websites')
@@ -42,16 +43,16 @@ class WebsiteLink:
 
     id: str
 
-    def __init__(self, guild: Guild, url: str, spoiler: bool = False) -> None:
+    def __init__(self, guild: GuildSettings, url: str, spoiler: bool = False) -> None:
         """
         Initialize the website.
 
-        :param guild: The guild where the link has been sent
+        :param guild: The settings of the guild where the link has been sent
         :param url: The URL to fix
         :param spoiler: Whether the link should be rendered as a spoiler
         """
 
-        self.guild: Guild = guild
+        self.guild: GuildSettings = guild
         self.url: str = url
         self.spoiler: bool = spoiler
         self._rendered: str | None = None
@@ -154,7 +155,7 @@ class GenericWebsiteLink(WebsiteLink):
     is_ssl: bool = True
     routes: dict[str, re.Pattern[str]] = {}
 
-    def __init__(self, guild: Guild, url: str, spoiler: bool = False) -> None:
+    def __init__(self, guild: GuildSettings, url: str, spoiler: bool = False) -> None:
         """
         Initialize the website.
 
@@ -167,7 +168,7 @@ class GenericWebsiteLink(WebsiteLink):
         self.match, self.repl = self.get_match_and_repl()
 
     @classmethod
-    def if_valid(cls, guild: Guild, url: str, spoiler: bool = False) -> Self | None:
+    def if_valid(cls, guild: GuildSettings, url: str, spoiler: bool = False) -> Self | None:
         """
         Return a website if the URL is valid.
 
@@ -177,7 +178,7 @@ class GenericWebsiteLink(WebsiteLink):
         :return: the website if the URL is valid, None otherwise
         """
 
-        if not guild[cls.id]:
+        if not guild.website_enabled(cls.id):
             return None
 
         website = cls(guild, url, spoiler)
@@ -230,13 +231,13 @@ class GenericWebsiteLink(WebsiteLink):
         if not self.is_translation:
             return ""
 
-        return f"/{self.guild.lang}" if self.guild[f"{self.id}_tr"] else ""
+        return f"/{self.guild.lang}" if self.guild.translation_enabled(self.id) else ""
 
     def route_fix_subdomain(self) -> str:
         if not self.subdomains:
             return ''
         # noinspection PyTypeChecker
-        return self.subdomains[self.guild[f"{self.id}_view"]]
+        return self.subdomains[self.guild.views[self.id]]
 
 
     def get_match_and_repl(self) -> tuple[re.Match[str] | None, str | None]:
@@ -876,7 +877,7 @@ class CustomLink(WebsiteLink):
 
     id = 'custom'
 
-    def __init__(self, guild: Guild, url: str, spoiler: bool = False) -> None:
+    def __init__(self, guild: GuildSettings, url: str, spoiler: bool = False) -> None:
         super().__init__(guild, url, spoiler)
         self.fixed_link: str | None = None
         self.hypertext_label: str | None = None
@@ -885,14 +886,13 @@ class CustomLink(WebsiteLink):
         # noinspection PyTypeChecker
         self.custom_websites: Iterable = guild.custom_websites
         for website in self.custom_websites:
-            if match := re.fullmatch(
-                    fr"https?://(?:www\.)?({re.escape(website.domain)})/(.+)", self.url, re.IGNORECASE):
+            if match := website.pattern.fullmatch(self.url):
                 self.fixed_link = f"https://{website.fix_domain}/{match[2]}"
                 self.hypertext_label = website.name
                 self.fixer_domain = website.fix_domain
 
     @classmethod
-    def if_valid(cls, guild: Guild, url: str, spoiler: bool = False) -> Self | None:
+    def if_valid(cls, guild: GuildSettings, url: str, spoiler: bool = False) -> Self | None:
 
         if not guild.custom_websites:
             return None
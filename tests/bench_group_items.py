@@ -0,0 +1,54 @@
+"""
+Benchmark of `group_items` on the rendered links of a message: the former implementation is compared with the
+`next_fit` and `first_fit_decreasing` packings, by messages sent and by time per call.
+
+The links are random strings of the size of rendered links (a fixed link and its optional spoiler and markdown
+wrapping), up to the 2000 characters of a Discord message.
+
+Run with `python -m tests.bench_group_items [messages] [max links per message]`.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import timeit
+
+from src.utils import group_items
+from tests.test_group_items import old_group_items
+
+
+def rendered_links(rng: random.Random, max_links: int) -> list[str]:
+    """
+    Generate the rendered links of a message.
+
+    :param rng: the random generator
+    :param max_links: the maximum number of links
+    :return: the rendered links
+    """
+    return [
+        "x" * rng.choice((rng.randint(40, 120), rng.randint(120, 600), rng.randint(600, 1900)))
+        for _ in range(rng.randint(1, max_links))
+    ]
+
+
+def main() -> None:
+    args = [int(arg) for arg in sys.argv[1:3]]
+    messages, max_links = args + [2000, 30][len(args):]
+    rng = random.Random(0)
+    cases = [rendered_links(rng, max_links) for _ in range(messages)]
+    print(f"{messages} messages, up to {max_links} links each")
+
+    implementations = {
+        'old': lambda links: old_group_items(links, 2000),
+        'next_fit': lambda links: group_items(links, 2000),
+        'first_fit_decreasing': lambda links: group_items(links, 2000, packing='first_fit_decreasing'),
+    }
+    for name, implementation in implementations.items():
+        sent = sum(len(implementation(links)) for links in cases)
+        duration = min(timeit.repeat(lambda: [implementation(links) for links in cases], number=1, repeat=5))
+        print(f"{name:<22} {sent:>7} messages sent {duration / messages * 1e6:>8.1f} µs/call")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark of a guild-join burst, e.g. when the bot is added to many servers at once: the first messages of many new
+guilds, several per guild at the same time, each loading its guild with `Guild.find_or_create` in a worker thread.
+
+The insert-ignore path is compared with the former `find` -> `create` -> `fresh` one, by statements sent per guild and
+by wall time, on the test database (SQLite, `sqlite_wal` driver). A statement is a round trip on a networked database.
+
+Run with `python -m tests.bench_guild_join [guilds] [messages per guild] [threads]`.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from tests.conftest import cleanup, migrate
+
+from database.connections import WALSQLiteConnection
+from database.models.Guild import Guild
+
+
+def find_create_fresh(d_guild) -> Guild:
+    """The former `Guild.find_or_create`, racy under concurrency"""
+    guild = Guild.find(d_guild.id)
+    if guild is None:
+        guild = Guild.create({'id': d_guild.id}).fresh()
+    return guild
+
+
+def run(name: str, find_or_create, first_id: int, guilds: int, messages: int, threads: int) -> None:
+    """
+    Load each new guild from several concurrent messages, and print the statements sent and the time taken.
+
+    :param name: the name of the path, as printed
+    :param find_or_create: the function loading a guild
+    :param first_id: the id of the first guild, the others following
+    :param guilds: the number of new guilds
+    :param messages: the number of concurrent messages per guild
+    :param threads: the number of worker threads
+    """
+
+    statements = 0
+    query = WALSQLiteConnection.query
+
+    def counting_query(self, sql, bindings=(), results="*"):
+        nonlocal statements
+        statements += 1
+        return query(self, sql, bindings, results)
+
+    def load(guild_id: int) -> bool:
+        try:
+            return find_or_create(SimpleNamespace(id=guild_id)).id == guild_id
+        except Exception:
+            return False
+
+    ids = [guild_id for guild_id in range(first_id, first_id + guilds) for _ in range(messages)]
+    WALSQLiteConnection.query = counting_query
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            loaded = sum(executor.map(load, ids))
+        duration = time.perf_counter() - start
+    finally:
+        WALSQLiteConnection.query = query
+
+    created = Guild.where('id', '>=', first_id).where('id', '<', first_id + guilds).count()
+    print(f"{name:<22} {statements / guilds:>6.2f} statements/guild {duration * 1000:>9.1f} ms "
+          f"{created:>6} guilds created {len(ids) - loaded:>6} failed lookups")
+
+
+def main() -> None:
+    args = [int(arg) for arg in sys.argv[1:4]]
+    guilds, messages, threads = args + [1000, 3, 8][len(args):]
+    migrate()
+    try:
+        print(f"{guilds} new guilds, {messages} concurrent messages per guild, {threads} threads")
+        run('find/create/fresh', find_create_fresh, 1_000_000, guilds, messages, threads)
+        run('find/insert-ignore', Guild.find_or_create, 2_000_000, guilds, messages, threads)
+        print("Already known guilds:")
+        run('find/create/fresh', find_create_fresh, 1_000_000, guilds, messages, threads)
+        run('find/insert-ignore', Guild.find_or_create, 2_000_000, guilds, messages, threads)
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark of the channel, member and role lookups of `on_message` during a burst: messages arriving at a steady rate
+in many guilds, each checking its channel, its author and the author's roles against the filter lists.
+
+The batched lookups (`load_get_enabled`, `loads_get_enabled`) are compared with the former per-message ones
+(`find_get_enabled`, `finds_get_enabled`, run on the event loop), by statements sent per message, by message latency
+(from its arrival to the end of its checks), by the longest stall of the event loop and by wall time, on the test
+database (SQLite, `sqlite_wal` driver).
+
+Run with `python -m tests.bench_message_lookups [messages] [seconds] [guilds]`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+from masoniteorm.query import QueryBuilder
+
+from tests.conftest import cleanup, migrate
+
+from database.connections import WALSQLiteConnection
+from database.guild_settings import GuildSettings
+from database.models.Member import Member
+from database.models.Role import Role
+from database.models.TextChannel import TextChannel
+
+CHANNELS = 10
+MEMBERS = 50
+ROLES = 10
+ROLES_PER_MEMBER = 3
+
+
+def populate(guilds: int) -> None:
+    """
+    Create the guilds, with their channels, members and roles, some of them on the filter lists.
+
+    :param guilds: the number of guilds
+    """
+
+    rng = random.Random(0)
+    QueryBuilder().table('guilds').bulk_create([{'id': guild_id} for guild_id in range(1, guilds + 1)])
+    for table, per_guild in (('text_channels', CHANNELS), ('roles', ROLES)):
+        QueryBuilder().table(table).bulk_create([
+            {'id': guild_id * 1000 + i, 'guild_id': guild_id, 'on_deny_list': rng.random() < 0.1}
+            for guild_id in range(1, guilds + 1) for i in range(per_guild)])
+    QueryBuilder().table('members').bulk_create([
+        {'user_id': guild_id * 1000 + i, 'guild_id': guild_id, 'bot': False, 'on_deny_list': rng.random() < 0.1}
+        for guild_id in range(1, guilds + 1) for i in range(MEMBERS)])
+
+
+def messages(count: int, guilds: int) -> list[SimpleNamespace]:
+    """
+    Generate the messages of the burst, the channels and members being drawn among the existing and unknown ones.
+
+    :param count: the number of messages
+    :param guilds: the number of guilds
+    :return: the messages, with their guild settings, channel and author
+    """
+
+    rng = random.Random(1)
+    result = []
+    for _ in range(count):
+        guild_id = rng.randint(1, guilds)
+        d_guild = SimpleNamespace(id=guild_id)
+        result.append(SimpleNamespace(
+            guild=GuildSettings.default(guild_id),
+            channel=SimpleNamespace(id=guild_id * 1000 + rng.randrange(CHANNELS + 2), guild=d_guild),
+            author=SimpleNamespace(
+                id=guild_id * 1000 + rng.randrange(MEMBERS + 5), bot=False, guild=d_guild,
+                roles=[SimpleNamespace(id=guild_id * 1000 + role, guild=d_guild)
+                       for role in rng.sample(range(ROLES + 2), ROLES_PER_MEMBER)])))
+    return result
+
+
+async def check_per_message(message) -> bool:
+    """The former checks, one query per lookup, run on the event loop"""
+    guild = message.guild
+    return (TextChannel.find_get_enabled(message.channel, guild)
+            and Member.find_get_enabled(message.author, guild)
+            and all(Role.finds_get_enabled(message.author.roles, guild)))
+
+
+async def check_batched(message) -> bool:
+    """The checks of `on_message`"""
+    guild = message.guild
+    if not await TextChannel.load_get_enabled(message.channel, guild):
+        return False
+    member_enabled, roles_enabled = await asyncio.gather(
+        Member.load_get_enabled(message.author, guild),
+        Role.loads_get_enabled(message.author.roles, guild))
+    return member_enabled and all(roles_enabled)
+
+
+async def burst(check, burst_messages: list[SimpleNamespace], seconds: float) -> tuple[list[float], float, int]:
+    """
+    Deliver the messages evenly over a period, each one checked in its own task.
+
+    :param check: the checks of a message
+    :param burst_messages: the messages
+    :param seconds: the duration of the burst
+    :return: the latency of each message and the longest stall of the event loop, in seconds, and the number of
+        messages passing the checks
+    """
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    latencies = []
+    stall = 0.0
+
+    async def heartbeat() -> None:
+        nonlocal stall
+        while True:
+            before = loop.time()
+            await asyncio.sleep(0.001)
+            stall = max(stall, loop.time() - before - 0.001)
+
+    async def handle(message, arrival: float) -> bool:
+        await asyncio.sleep(max(0.0, arrival - loop.time()))
+        arrived = max(arrival, loop.time())
+        enabled = await check(message)
+        latencies.append(loop.time() - arrived)
+        return enabled
+
+    interval = seconds / len(burst_messages)
+    heartbeat_task = asyncio.create_task(heartbeat())
+    passed = await asyncio.gather(*(
+        handle(message, start + i * interval) for i, message in enumerate(burst_messages)))
+    heartbeat_task.cancel()
+    return latencies, stall, sum(passed)
+
+
+def run(name: str, check, burst_messages: list[SimpleNamespace], seconds: float) -> None:
+    """
+    Run a burst, and print the statements sent and the latencies.
+
+    :param name: the name of the lookups, as printed
+    :param check: the checks of a message
+    :param burst_messages: the messages
+    :param seconds: the duration of the burst
+    """
+
+    statements = 0
+    query = WALSQLiteConnection.query
+
+    def counting_query(self, sql, bindings=(), results="*"):
+        nonlocal statements
+        statements += 1
+        return query(self, sql, bindings, results)
+
+    WALSQLiteConnection.query = counting_query
+    try:
+        start = time.perf_counter()
+        latencies, stall, passed = asyncio.run(burst(check, burst_messages, seconds))
+        duration = time.perf_counter() - start
+    finally:
+        WALSQLiteConnection.query = query
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<12} {statements / len(burst_messages):>5.2f} statements/message "
+          f"latency p50 {statistics.median(latencies) * 1000:>6.2f} ms p99 {p99 * 1000:>6.2f} ms "
+          f"max {latencies[-1] * 1000:>6.2f} ms, loop stalled {stall * 1000:>6.2f} ms at most, "
+          f"{duration:>5.2f} s, {passed} messages passed")
+
+
+def main() -> None:
+    args = [float(arg) for arg in sys.argv[1:4]]
+    count, seconds, guilds = args + [500, 1, 100][len(args):]
+    count, guilds = int(count), int(guilds)
+    migrate()
+    try:
+        populate(guilds)
+        burst_messages = messages(count, guilds)
+        print(f"{count} messages in {seconds:g} s, in {guilds} guilds")
+        run('per message', check_per_message, burst_messages, seconds)
+        run('batched', check_batched, burst_messages, seconds)
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Fixtures of the test suite.
+
+The tests run against a temporary SQLite database, with the `sqlite_wal` driver, migrated once per session with the
+migrations of `database/migrations`. Run them from anywhere with `python -m pytest`; the bot config (`config.yml`) is
+loaded as for the bot, from the root of the repository.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+os.chdir(ROOT)
+
+_directory = tempfile.mkdtemp(prefix='fixtweetbot-tests-')
+os.environ['TEST_DATABASE'] = os.path.join(_directory, 'tests.db')
+os.environ['TEST_SCRATCH_DATABASE'] = os.path.join(_directory, 'scratch.db')
+os.environ['DB_CONFIG_PATH'] = 'tests/db_config.py'
+
+import discore
+
+if not discore.config.loaded:
+    discore.config_init()
+
+
+def migrate(connection: str = 'default') -> None:
+    """
+    Run the migrations of the bot on a test database.
+
+    :param connection: the name of the connection to the database
+    """
+
+    from masoniteorm.migrations import Migration
+
+    migration = Migration(connection=connection, migration_directory='database/migrations')
+    migration.create_table_if_not_exists()
+    migration.migrate()
+
+
+def cleanup() -> None:
+    """Delete the test database"""
+    shutil.rmtree(_directory, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def database() -> str:
+    """The migrated test database, as the name of its connection"""
+
+    migrate()
+    yield 'default'
+    cleanup()
@@ -0,0 +1,20 @@
+"""
+Database configuration of the test suite and of the benchmarks, used as `DB_CONFIG_PATH` instead of
+`database/config.py`: temporary SQLite databases, with the `sqlite_wal` driver (`WALSQLiteConnection`). The `main` one
+is migrated once per session, the `scratch` one is left to the tests of the migrations. Their paths are set by
+`tests/conftest.py`.
+"""
+
+import os
+
+from masoniteorm.connections import ConnectionResolver, ConnectionFactory
+
+from database.connections import WALSQLiteConnection
+
+ConnectionFactory.register('sqlite_wal', WALSQLiteConnection)
+
+DB = ConnectionResolver().set_connection_details({
+    "default": "main",
+    "main": {"driver": "sqlite_wal", "database": os.environ['TEST_DATABASE']},
+    "scratch": {"driver": "sqlite_wal", "database": os.environ['TEST_SCRATCH_DATABASE']},
+})
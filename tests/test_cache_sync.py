@@ -0,0 +1,90 @@
+"""
+Tests of the invalidation polling of `CacheSync`, on the test database.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+
+import pytest
+from masoniteorm.query import QueryBuilder
+
+from database.cache_sync import CacheSync
+
+
+@pytest.fixture
+def invalidated(database, monkeypatch) -> list[int | None]:
+    """The guild ids invalidated by the polls of the test, from a fresh `CacheSync` state"""
+
+    QueryBuilder().table(CacheSync.__table__).delete()
+    received = []
+    monkeypatch.setattr(CacheSync, '_handlers', {'guilds': [received.append]})
+    monkeypatch.setattr(CacheSync, '_since', None)
+    monkeypatch.setattr(CacheSync, '_applied', {})
+    monkeypatch.setattr(CacheSync, '_started', False)
+    monkeypatch.setattr(CacheSync, '_last_poll', 0.0)
+    yield received
+    QueryBuilder().table(CacheSync.__table__).delete()
+
+
+def record(guild_id: int, change_id: int | None = None, origin: str = 'other') -> None:
+    """
+    Record a change, as another process would.
+
+    :param guild_id: the changed guild
+    :param change_id: the id of the change, None to let the database give it
+    :param origin: the process that made the change
+    """
+    values = {'origin': origin, 'table_name': 'guilds', 'guild_id': guild_id}
+    if change_id is not None:
+        values['id'] = change_id
+    QueryBuilder().table(CacheSync.__table__).create(values)
+
+
+def test_first_poll_skips_recorded_changes(invalidated):
+    record(1)
+    assert asyncio.run(CacheSync.poll()) == 0
+    record(2)
+    assert asyncio.run(CacheSync.poll()) == 1
+    assert invalidated == [2]
+
+
+def test_changes_applied_once(invalidated):
+    asyncio.run(CacheSync.poll())
+    record(1)
+    record(2, origin=CacheSync.origin)
+    assert asyncio.run(CacheSync.poll()) == 1
+    assert asyncio.run(CacheSync.poll()) == 0
+    assert invalidated == [1]
+
+
+def test_late_commit_applied(invalidated):
+    asyncio.run(CacheSync.poll())
+    record(1, change_id=100)
+    assert asyncio.run(CacheSync.poll()) == 1
+    # committed after the change 100, though inserted before it
+    record(2, change_id=50)
+    assert asyncio.run(CacheSync.poll()) == 1
+    assert invalidated == [1, 2]
+
+
+def test_batches(invalidated):
+    asyncio.run(CacheSync.poll())
+    for guild_id in range(5):
+        record(guild_id)
+    assert asyncio.run(CacheSync.poll(batch_size=2)) == 5
+    assert asyncio.run(CacheSync.poll(batch_size=2)) == 0
+    assert invalidated == list(range(5))
+
+
+def test_prune_by_database_clock(invalidated):
+    # stamped hours away from the local clock, as by a database server in another timezone
+    base = dt.datetime(2001, 1, 1, 12)
+    for guild_id, minutes in enumerate((0, 30, 100, 150)):
+        QueryBuilder().table(CacheSync.__table__).create({
+            'origin': 'other', 'table_name': 'guilds', 'guild_id': guild_id,
+            'created_at': base + dt.timedelta(minutes=minutes)})
+    CacheSync.prune()
+    remaining = QueryBuilder().table(CacheSync.__table__).select('guild_id').order_by('guild_id').get()
+    assert [row['guild_id'] for row in remaining] == [2, 3]
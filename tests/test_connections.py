@@ -0,0 +1,66 @@
+"""
+Tests of the `sqlite_wal` backend (`WALSQLiteConnection`), which the rest of the test suite and the benchmarks run on.
+"""
+
+from __future__ import annotations
+
+import pytest
+from masoniteorm.migrations import Migration
+from masoniteorm.query import QueryBuilder
+
+from database.connections import WALSQLiteConnection
+from tests.conftest import migrate
+
+
+@pytest.fixture
+def connection(database) -> WALSQLiteConnection:
+    """A connection to the test database"""
+    return QueryBuilder().new_connection()
+
+
+def test_test_database_uses_wal_backend(connection):
+    assert isinstance(connection, WALSQLiteConnection)
+    assert connection.query('PRAGMA journal_mode', (), results=1)['journal_mode'] == 'wal'
+    assert connection.query('PRAGMA foreign_keys', (), results=1)['foreign_keys'] == 1
+    assert connection.query('PRAGMA synchronous', (), results=1)['synchronous'] == 1
+
+
+def test_reads_use_the_reader_pool(connection):
+    assert connection._is_read('SELECT 1')
+    assert connection._is_read('  pragma table_info("guilds")')
+    assert not connection._is_read('PRAGMA foreign_keys = OFF')
+    assert not connection._is_read('INSERT INTO guilds (id) VALUES (1)')
+
+    connection.query('SELECT 1', ())
+    reader = connection._readers[connection.database][-1]
+    assert reader is not connection._writer()
+
+
+def test_transactions_use_the_writer(connection):
+    connection.begin()
+    assert not connection._is_read('SELECT 1')
+    connection.query('INSERT INTO guilds (id) VALUES (?)', (8000,))
+    assert connection.query('SELECT id FROM guilds WHERE id = ?', (8000,), results=1) == {'id': 8000}
+    connection.rollback()
+    assert connection.query('SELECT id FROM guilds WHERE id = ?', (8000,), results=1) is None
+
+
+def test_migrations_round_trip(database):
+    def tables() -> set[str]:
+        rows = QueryBuilder().on('scratch').table('sqlite_master').select('name').where('type', 'table').get()
+        return {row['name'] for row in rows if not row['name'].startswith('sqlite_')}
+
+    def indexes() -> set[str]:
+        rows = QueryBuilder().on('scratch').table('sqlite_master').select('name').where('type', 'index').get()
+        return {row['name'] for row in rows if not row['name'].startswith('sqlite_')}
+
+    migrate('scratch')
+    migrated_tables, migrated_indexes = tables(), indexes()
+    assert {'guilds', 'members', 'roles', 'text_channels', 'events', 'cache_invalidations'} <= migrated_tables
+
+    Migration(connection='scratch', migration_directory='database/migrations').reset()
+    assert tables() == {'migrations'}
+
+    migrate('scratch')
+    assert tables() == migrated_tables
+    assert indexes() == migrated_indexes
@@ -0,0 +1,85 @@
+"""
+Tests of the event aggregations of the `/stats` command, on the test database.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+
+import discore
+import pytest
+from masoniteorm.query import QueryBuilder
+
+from database.models.Event import Event
+
+
+@pytest.fixture
+def hours(database, monkeypatch) -> tuple[str, str]:
+    """
+    Events of the last two hours, and an older one, as the buckets of the last two hours.
+
+    In the hour before the current one: two fixed links and a failed one on twitter, a fixed link on bluesky, and an
+    event without a link. Two hours before: a fixed link on twitter. Three days before: a fixed link on twitter.
+    """
+
+    monkeypatch.setattr(discore.config, 'analytic', True, raising=False)
+    QueryBuilder().table('events').delete()
+    hour = dt.datetime.now().replace(minute=0, second=0, microsecond=0)
+    last_hour, previous_hour = hour - dt.timedelta(hours=1), hour - dt.timedelta(hours=2)
+    events = [
+        ('fixed_link', 'twitter', last_hour),
+        ('fixed_link', 'twitter', last_hour + dt.timedelta(minutes=10)),
+        ('fixed_link_not_sent', 'twitter', last_hour + dt.timedelta(minutes=20)),
+        ('fixed_link', 'bluesky', last_hour + dt.timedelta(minutes=30)),
+        ('premium_update', None, last_hour + dt.timedelta(minutes=40)),
+        ('fixed_link', 'twitter', previous_hour),
+        ('fixed_link', 'twitter', hour - dt.timedelta(days=3)),
+    ]
+    Event.bulk_create([
+        {'name': name, 'data': json.dumps({'link': {'id': link_id}} if link_id else {}), 'created_at': created_at}
+        for name, link_id, created_at in events])
+    yield last_hour.strftime('%Y-%m-%d %H'), previous_hour.strftime('%Y-%m-%d %H')
+    QueryBuilder().table('events').delete()
+
+
+def test_count_since(hours):
+    assert Event.count_since(days=1) == 6
+    assert Event.count_since() == 7
+    assert Event.count_since('fixed_link', days=1) == 4
+    assert Event.count_since(('fixed_link', 'fixed_link_not_sent'), days=1) == 5
+
+
+def test_counts_by_name(hours):
+    assert Event.counts_by_name(days=1) == {'fixed_link': 4, 'fixed_link_not_sent': 1, 'premium_update': 1}
+    assert Event.counts_by_name('fixed_link_not_sent', days=1) == {'fixed_link_not_sent': 1}
+
+
+def test_counts_by_bucket(hours):
+    last_hour, previous_hour = hours
+    assert Event.counts_by_bucket('fixed_link', days=1) == {previous_hour: 1, last_hour: 3}
+    assert list(Event.counts_by_bucket('fixed_link', days=1)) == [previous_hour, last_hour]
+    assert sum(Event.counts_by_bucket('fixed_link', bucket='day', days=1).values()) == 4
+    assert all(len(bucket) == 10 for bucket in Event.counts_by_bucket(bucket='day'))
+    with pytest.raises(ValueError):
+        Event.counts_by_bucket(bucket='week')
+
+
+def test_counts_by_link(hours):
+    assert Event.counts_by_link(days=1) == {
+        'twitter': {'fixed_link': 3, 'fixed_link_not_sent': 1},
+        'bluesky': {'fixed_link': 1},
+    }
+
+
+def test_error_ratios(hours):
+    ratios = Event.error_ratios(days=1)
+    assert ratios == {'twitter': (4, 1, 0.25), 'bluesky': (1, 0, 0.0)}
+    assert list(ratios) == ['twitter', 'bluesky']
+
+
+def test_analytics_disabled(hours, monkeypatch):
+    monkeypatch.setattr(discore.config, 'analytic', False, raising=False)
+    assert Event.count_since(days=1) == 0
+    assert Event.counts_by_bucket(days=1) == {}
+    assert Event.error_ratios(days=1) == {}
@@ -0,0 +1,65 @@
+"""
+Tests of the Parquet export of the events table, on the test database.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+
+import pytest
+from masoniteorm.query import QueryBuilder
+
+from database import export_events
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+@pytest.fixture
+def events(database) -> list[int]:
+    """Five events created an hour ago, then two created now, as their ids"""
+
+    QueryBuilder().table('events').delete()
+    now = dt.datetime.now()
+    QueryBuilder().table('events').bulk_create([
+        {'name': 'fixed_link', 'data': '{}', 'created_at': created_at, 'updated_at': created_at}
+        for created_at in [now - dt.timedelta(hours=1)] * 5 + [now] * 2])
+    yield [row['id'] for row in QueryBuilder().table('events').select('id').order_by('id').get()]
+    QueryBuilder().table('events').delete()
+
+
+def exported_ids(output_dir) -> list[int]:
+    """The ids of the events exported to a directory"""
+    return [
+        event_id for path in sorted(output_dir.glob('events_*.parquet'))
+        for event_id in pq.read_table(path).column('id').to_pylist()]
+
+
+def test_recent_events_left_to_next_export(events, tmp_path):
+    assert export_events.export(tmp_path, batch_size=2, rows_per_file=3) == 5
+    assert exported_ids(tmp_path) == events[:5]
+    assert export_events.read_last_id(tmp_path) == events[4]
+
+    assert export_events.export(tmp_path, batch_size=2, margin_seconds=0) == 2
+    assert exported_ids(tmp_path) == events
+    assert export_events.read_last_id(tmp_path) == events[-1]
+
+
+def test_failed_export_leaves_no_partial_file(events, tmp_path, monkeypatch):
+    fetch_batch = export_events.fetch_batch
+    calls = 0
+
+    def failing_fetch_batch(last_id: int, batch_size: int) -> list[dict]:
+        nonlocal calls
+        calls += 1
+        if calls == 3:
+            raise RuntimeError("connection lost")
+        return fetch_batch(last_id, batch_size)
+
+    monkeypatch.setattr(export_events, 'fetch_batch', failing_fetch_batch)
+    with pytest.raises(RuntimeError):
+        export_events.export(tmp_path, batch_size=1, rows_per_file=10)
+    assert list(tmp_path.iterdir()) == []
+
+    monkeypatch.setattr(export_events, 'fetch_batch', fetch_batch)
+    assert export_events.export(tmp_path, batch_size=1, rows_per_file=10) == 5
+    assert exported_ids(tmp_path) == events[:5]
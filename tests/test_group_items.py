@@ -0,0 +1,97 @@
+"""
+Property tests of `group_items`, on seeded random lists of strings of the sizes of rendered links.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Iterable, TypeVar
+
+import pytest
+
+from src.utils import group_items
+
+T = TypeVar('T')
+
+SEEDS = range(200)
+PACKINGS = ('next_fit', 'first_fit_decreasing')
+
+
+def old_group_items(items: Iterable[T], max_group_size: int, sep: str = "\n") -> list[tuple[str, list[T]]]:
+    """The implementation `next_fit` replaces"""
+    groups: list[tuple[str, list[T]]] = []
+    for item in items:
+        item_str = str(item)
+        if not groups:
+            groups.append((item_str, [item]))
+        elif len(groups[-1][0]) + len(sep) + len(item_str) <= max_group_size:
+            groups[-1] = (groups[-1][0] + sep + item_str, groups[-1][1] + [item])
+        else:
+            groups.append((item_str, [item]))
+    return groups
+
+
+def random_case(seed: int) -> tuple[list[str], int, str]:
+    """
+    Generate the items, maximum group size and separator of a case.
+
+    :param seed: the seed of the case
+    :return: the items, all distinct, the maximum group size and the separator
+    """
+    rng = random.Random(seed)
+    max_group_size = rng.choice((10, 100, 2000))
+    sep = rng.choice(("\n", "", ", "))
+    items = [
+        f"{i}:" + "x" * rng.randint(0, max_group_size * rng.choice((1, 1, 1, 2)) // 2)
+        for i in range(rng.randint(0, 40))
+    ]
+    return items, max_group_size, sep
+
+
+@pytest.mark.parametrize('packing', PACKINGS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_every_item_once(seed, packing):
+    items, max_group_size, sep = random_case(seed)
+    groups = group_items(items, max_group_size, sep, packing=packing)
+    grouped = [item for _, group in groups for item in group]
+    assert sorted(grouped) == sorted(items)
+    assert all(string == sep.join(group) for string, group in groups)
+
+
+@pytest.mark.parametrize('packing', PACKINGS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_group_size(seed, packing):
+    items, max_group_size, sep = random_case(seed)
+    for string, group in group_items(items, max_group_size, sep, packing=packing):
+        assert group
+        assert len(string) <= max_group_size or len(group) == 1
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_next_fit_matches_old_implementation(seed):
+    items, max_group_size, sep = random_case(seed)
+    assert group_items(items, max_group_size, sep) == old_group_items(items, max_group_size, sep)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_first_fit_decreasing_not_worse(seed):
+    items, max_group_size, sep = random_case(seed)
+    packed = group_items(items, max_group_size, sep, packing='first_fit_decreasing')
+    assert len(packed) <= len(group_items(items, max_group_size, sep))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_first_fit_decreasing_keeps_order(seed):
+    items, max_group_size, sep = random_case(seed)
+    groups = group_items(items, max_group_size, sep, packing='first_fit_decreasing')
+    for _, group in groups:
+        assert group == sorted(group, key=items.index)
+    assert [group[0] for _, group in groups] == sorted((group[0] for _, group in groups), key=items.index)
+
+
+def test_first_fit_decreasing_saves_groups():
+    # next fit can't put the second short item with the first one: 3 groups, where 2 are enough
+    items = ["a" * 5, "b" * 5, "c" * 3, "d" * 3]
+    assert len(group_items(items, 8, "")) == 3
+    assert group_items(items, 8, "", packing='first_fit_decreasing') == [
+        ("aaaaaccc", ["aaaaa", "ccc"]), ("bbbbbddd", ["bbbbb", "ddd"])]
@@ -0,0 +1,68 @@
+"""
+Tests of the worker threads of `DBHealth.run`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import discore
+import pytest
+
+from database.health import DatabaseUnavailable, DBHealth
+
+
+@pytest.fixture
+def health(monkeypatch):
+    """A closed circuit, with 2 worker threads and a 50 ms timeout"""
+    monkeypatch.setattr(discore.config, 'degraded_mode', SimpleNamespace(
+        timeout_ms=50, slow_ms=50, failure_threshold=100, cooldown_seconds=30, max_threads=2), raising=False)
+    for attribute, value in (('_failures', 0), ('_opened_at', None), ('_probing', False), ('_threads', None)):
+        monkeypatch.setattr(DBHealth, attribute, value)
+    return DBHealth
+
+
+def test_timed_out_lookups_keep_their_thread(health):
+    release = threading.Event()
+    started = []
+
+    def blocked_lookup(i: int) -> int:
+        started.append(i)
+        release.wait(5)
+        return i
+
+    async def main() -> int:
+        for i in range(3):
+            with pytest.raises(DatabaseUnavailable):
+                await health.run(blocked_lookup, i)
+        # the first two lookups still hold the threads, the third one never started
+        assert started == [0, 1]
+        release.set()
+        return await health.run(lambda: 42)
+
+    assert asyncio.run(main()) == 42
+    assert started == [0, 1]
+
+
+def test_concurrent_lookups_wait_for_a_thread(health):
+    running = 0
+    most_running = 0
+    lock = threading.Lock()
+
+    def lookup(i: int) -> int:
+        nonlocal running, most_running
+        with lock:
+            running += 1
+            most_running = max(most_running, running)
+        threading.Event().wait(0.005)
+        with lock:
+            running -= 1
+        return i
+
+    async def main() -> list[int]:
+        return list(await asyncio.gather(*(health.run(lookup, i) for i in range(6))))
+
+    assert asyncio.run(main()) == list(range(6))
+    assert most_running <= 2
@@ -0,0 +1,118 @@
+"""
+Query plan regression tests of the hot queries.
+
+Each test runs a lookup of the message path (or an aggregation of the events) against the test database, records the
+SELECT statements it sends, and fails if SQLite plans any of them as a full scan of a table or of an index.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from types import SimpleNamespace
+
+import pytest
+from masoniteorm.query import QueryBuilder
+
+from database.connections import WALSQLiteConnection
+
+GUILD_ID = 1000
+USER_ID = 2000
+CHANNEL_ID = 3000
+ROLE_ID = 4000
+
+
+@pytest.fixture
+def queries(database, monkeypatch) -> list[tuple[str, tuple]]:
+    """The SELECT statements sent to the database during the test, with their bindings"""
+
+    recorded = []
+    query = WALSQLiteConnection.query
+
+    def recording_query(self, sql, bindings=(), results="*"):
+        if isinstance(sql, str) and sql.lstrip().upper().startswith('SELECT'):
+            recorded.append((sql, tuple(bindings)))
+        return query(self, sql, bindings, results)
+
+    monkeypatch.setattr(WALSQLiteConnection, 'query', recording_query)
+    return recorded
+
+
+@pytest.fixture(scope='module')
+def rows(database):
+    """A guild with a text channel, a member, a role and a few events"""
+
+    from database.models.Guild import Guild
+    from database.models.Member import Member
+    from database.models.Role import Role
+    from database.models.TextChannel import TextChannel
+    from database.models.Event import Event
+
+    guild = Guild.find_or_create(SimpleNamespace(id=GUILD_ID))
+    TextChannel.find_or_create(SimpleNamespace(id=CHANNEL_ID, guild=SimpleNamespace(id=GUILD_ID)), guild)
+    Role.find_or_create(SimpleNamespace(id=ROLE_ID, guild=SimpleNamespace(id=GUILD_ID)), guild)
+    Member.find_or_create(SimpleNamespace(id=USER_ID, bot=False, guild=SimpleNamespace(id=GUILD_ID)), guild)
+    Event.bulk_create([
+        {'name': name, 'data': '{"link": {"id": "twitter"}}', 'created_at': dt.datetime.now()}
+        for name in ('fixed_link', 'fixed_link', 'fixed_link_no_embed', 'fixed_link_not_sent')])
+    return guild
+
+
+def full_scans(sql: str, bindings: tuple) -> list[str]:
+    """
+    Get the steps of the plan of a query that scan a whole table or index.
+
+    :param sql: the query
+    :param bindings: the bindings of the query
+    :return: the details of the scanning steps, e.g. `SCAN members`
+    """
+
+    plan = QueryBuilder().new_connection().query(f'EXPLAIN QUERY PLAN {sql}', bindings)
+    return [step['detail'] for step in plan if step['detail'].startswith('SCAN ')]
+
+
+def assert_no_full_scan(queries: list[tuple[str, tuple]]) -> None:
+    """Check that at least a query was recorded, and that none of them is planned as a full scan"""
+
+    assert queries
+    for sql, bindings in queries:
+        assert not full_scans(sql, bindings), f"{sql} is planned as a full scan: {full_scans(sql, bindings)}"
+
+
+def test_guild_find(rows, queries):
+    from database.models.Guild import Guild
+
+    assert Guild.find_or_create(SimpleNamespace(id=GUILD_ID)).id == GUILD_ID
+    assert_no_full_scan(queries)
+
+
+def test_member_batch_lookup(rows, queries):
+    from database.models.Member import Member
+
+    members = Member._fetch_lists([(USER_ID, GUILD_ID), (USER_ID + 1, GUILD_ID), (USER_ID, GUILD_ID + 1)])
+    assert list(members) == [(USER_ID, GUILD_ID)]
+    assert_no_full_scan(queries)
+
+
+@pytest.mark.parametrize('model, element_id', [('TextChannel', CHANNEL_ID), ('Role', ROLE_ID)])
+def test_batch_lookup(rows, queries, model, element_id):
+    import database.models.Role
+    import database.models.TextChannel
+
+    model = getattr(getattr(database.models, model), model)
+    elements = model._fetch_lists([element_id, element_id + 1])
+    assert list(elements) == [element_id]
+    assert_no_full_scan(queries)
+
+
+@pytest.mark.parametrize('aggregate, args, kwargs', [
+    ('count_since', ('fixed_link',), {'days': 1}),
+    ('counts_by_name', (('fixed_link', 'fixed_link_no_embed'),), {'days': 1}),
+    ('counts_by_bucket', ('fixed_link',), {'bucket': 'hour', 'days': 1}),
+    ('counts_by_link', (('fixed_link', 'fixed_link_no_embed'),), {'days': 1}),
+    ('error_ratios', (), {'days': 1}),
+])
+def test_event_aggregation(rows, queries, aggregate, args, kwargs):
+    from database.models.Event import Event
+
+    assert getattr(Event, aggregate)(*args, **kwargs)
+    assert_no_full_scan(queries)
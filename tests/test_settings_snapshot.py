@@ -0,0 +1,78 @@
+"""
+Tests of the settings snapshot file, and of its saving by the settings cache.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+
+import pytest
+
+from database.guild_settings import GuildSettings, SettingsCache
+from database.settings_snapshot import SettingsSnapshot
+
+GUILD_IDS = (1, 2, 3)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    """The path of a snapshot of the default settings of `GUILD_IDS`"""
+    path = tmp_path / 'settings.bin'
+    SettingsSnapshot.write(path, [GuildSettings.default(guild_id) for guild_id in GUILD_IDS])
+    return path
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """An empty settings cache"""
+    monkeypatch.setattr(SettingsCache, '_entries', OrderedDict())
+    monkeypatch.setattr(SettingsCache, '_versions', {})
+    monkeypatch.setattr(SettingsCache, '_unvalidated', set())
+    monkeypatch.setattr(SettingsCache, '_snapshot', None)
+    yield SettingsCache
+    SettingsCache.clear()
+
+
+def test_round_trip(snapshot_path):
+    snapshot = SettingsSnapshot(snapshot_path)
+    assert len(snapshot) == len(GUILD_IDS)
+    assert snapshot.pop(2).id == 2
+    assert 2 not in snapshot and 1 in snapshot
+    snapshot.close()
+
+
+def test_raw_entries_outlive_the_snapshot(snapshot_path, tmp_path):
+    snapshot = SettingsSnapshot(snapshot_path)
+    entries = snapshot.raw_entries({1, 3})
+    snapshot.close()
+    assert snapshot.read_raw(0, 1) is None
+    assert snapshot.raw_entries() == {}
+
+    path = tmp_path / 'copy.bin'
+    assert SettingsSnapshot.write(path, [GuildSettings.default(4)], entries) == 3
+    copy = SettingsSnapshot(path)
+    assert {guild_id: copy.pop(guild_id).id for guild_id in (1, 3, 4)} == {1: 1, 3: 3, 4: 4}
+    copy.close()
+
+
+def test_save_while_cleared(cache, snapshot_path, tmp_path, monkeypatch):
+    cleared = threading.Event()
+    write = SettingsSnapshot.write
+
+    def delayed_write(*args, **kwargs):
+        cleared.wait(5)
+        return write(*args, **kwargs)
+
+    async def save_and_clear() -> int:
+        save = asyncio.create_task(cache.save_snapshot(str(tmp_path / 'saved.bin')))
+        # let the save hand its write to a worker thread, then close the snapshot it copies from
+        await asyncio.sleep(0)
+        cache.clear()
+        cleared.set()
+        return await save
+
+    monkeypatch.setattr(SettingsSnapshot, 'write', staticmethod(delayed_write))
+    cache.load_snapshot(str(snapshot_path))
+    assert asyncio.run(save_and_clear()) == len(GUILD_IDS)
@@ -0,0 +1,67 @@
+"""
+Tests of `insert_ignore`, on the test database.
+"""
+
+from __future__ import annotations
+
+import pytest
+from masoniteorm.exceptions import QueryException
+
+from database.connections import WALSQLiteConnection
+from database.models.Guild import Guild
+from database.models.TextChannel import TextChannel
+from database.upsert import _mssql_duplicate_key, insert_ignore
+
+GUILD_ID = 9000
+CHANNEL_ID = 9100
+
+
+@pytest.fixture
+def clean(database):
+    """Delete the rows created by the test"""
+    yield
+    TextChannel.where('id', CHANNEL_ID).delete()
+    Guild.where('id', GUILD_ID).delete()
+
+
+def test_insert_then_duplicate(clean):
+    guild = insert_ignore(Guild, {'id': GUILD_ID})
+    assert guild is not None and guild.id == GUILD_ID
+    assert insert_ignore(Guild, {'id': GUILD_ID}) is None
+    assert Guild.where('id', GUILD_ID).count() == 1
+
+
+def test_other_errors_raised(clean):
+    with pytest.raises(QueryException):
+        insert_ignore(TextChannel, {'id': CHANNEL_ID, 'guild_id': GUILD_ID})
+
+
+def test_other_errors_raised_without_returning(clean, monkeypatch):
+    # a driver with neither ON CONFLICT nor ON DUPLICATE KEY: the plain insert is sent
+    monkeypatch.setattr(WALSQLiteConnection, 'name', 'mssql')
+    with pytest.raises(QueryException):
+        insert_ignore(TextChannel, {'id': CHANNEL_ID, 'guild_id': GUILD_ID})
+
+
+def query_exception(*args) -> QueryException:
+    """A QueryException raised from a driver error with the given arguments"""
+    try:
+        try:
+            raise Exception(*args)
+        except Exception as e:
+            raise QueryException(str(e)) from e
+    except QueryException as e:
+        return e
+
+
+def test_mssql_duplicate_key():
+    assert _mssql_duplicate_key(query_exception(
+        '23000', "[23000] Violation of PRIMARY KEY constraint 'PK_guilds'. Cannot insert duplicate key in object "
+                 "'dbo.guilds'. (2627) (SQLExecDirectW)"))
+    assert _mssql_duplicate_key(query_exception(
+        '23000', "[23000] Cannot insert duplicate key row in object 'dbo.members' with unique index "
+                 "'members_user_id_guild_id_unique'. (2601) (SQLExecDirectW)"))
+    assert not _mssql_duplicate_key(query_exception(
+        '23000', "[23000] The INSERT statement conflicted with the FOREIGN KEY constraint "
+                 "'text_channels_guild_id_foreign'. (547) (SQLExecDirectW)"))
+    assert not _mssql_duplicate_key(QueryException("connection lost"))